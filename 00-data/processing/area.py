@@ -1,21 +1,29 @@
 import geopandas as gpd
+from geometry_metrics import geometry_metrics, projected_geometry_array
 
-# Hardcoded input and output file paths
-input_geojson = "./00-data/geojson/datazones2011_data_normalized.geojson"
-output_geojson = "./00-data/geojson/datazones2011_data_normalized_with_id_area.geojson"
+def add_id_and_area(input_geojson="./00-data/geojson/datazones2011_data_normalized.geojson",
+                    output_geojson="./00-data/geojson/datazones2011_data_normalized_with_id_area.geojson"):
+    """
+    Add a unique id and the area in square meters to every feature.
+    
+    Args:
+        input_geojson (str): Input GeoJSON
+        output_geojson (str): Output GeoJSON
+    """
+    # Read the GeoJSON file
+    gdf = gpd.read_file(input_geojson)
+    
+    # Add a unique id as the first column
+    gdf.insert(0, 'id', range(len(gdf)))
+    
+    # Measure in British National Grid (EPSG:27700) without reprojecting the frame itself
+    metrics = geometry_metrics(projected_geometry_array(gdf))
+    
+    # Area in square meters
+    gdf['area'] = metrics['area'].to_numpy()
+    
+    # Save to GeoJSON
+    gdf.to_file(output_geojson, driver='GeoJSON')
 
-# Read the GeoJSON file
-gdf = gpd.read_file(input_geojson)
-
-# Add a unique id as the first column
-gdf.insert(0, 'id', range(len(gdf)))
-
-# Project to a CRS with meters as units for accurate area calculation (e.g., British National Grid)
-# EPSG:27700 is common for the UK; change if your data is elsewhere
-gdf_projected = gdf.to_crs(epsg=27700)
-
-# Calculate area in square meters and add as a new column
-gdf['area'] = gdf_projected.geometry.area
-
-# Save to GeoJSON
-gdf.to_file(output_geojson, driver='GeoJSON')
+if __name__ == "__main__":
+    add_id_and_area()
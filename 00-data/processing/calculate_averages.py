@@ -1,8 +1,8 @@
 import pandas as pd
 
 # Hardcoded input and output file paths
-INPUT_FILE = "00-data\csv\key-services-travel-time.csv"  # Path to your input CSV file
-OUTPUT_FILE = "00-data\csv\key-services-travel-time-average.csv"  # Path where the output CSV will be saved
+INPUT_FILE = "./00-data/csv/key-services-travel-time.csv"  # Path to your input CSV file
+OUTPUT_FILE = "./00-data/csv/key-services-travel-time-average.csv"  # Path where the output CSV will be saved
 
 def calculate_averages(input_file, output_file):
     """
@@ -0,0 +1,199 @@
+"""
+Single entry point for the data processing stages.
+
+Usage: python 00-data/processing/cli.py <command> [options]
+
+Only the standard library is imported up front. Each command imports its
+stage module when it runs, so help, run status and index queries do not pay
+for geopandas, pyproj or shapely.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROCESSING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Commands handled by a stage module's own argument parser: (module, entry point, help)
+PASSTHROUGH_COMMANDS = {
+    "score": ("generate_scored_lands", "run", "Fetch and score empty lands"),
+    "stream": ("streaming_pipeline", "main", "Fetch, score and write empty lands as a streaming pipeline"),
+    "partition": ("partitioned_scoring", "main", "Spatially partitioned scoring across workers"),
+    "query": ("query_scored_lands", "main", "Build the query index or select top-K plots"),
+    "reweight": ("reweight_scores", "main", "Re-score plots under a weights config"),
+    "sensitivity": ("sensitivity_analysis", "main", "Monte Carlo sensitivity of plot rankings to the weights"),
+    "lookup": ("datazone_lookup", "main", "Export the compact datazone lookup for isochrone analysis"),
+    "rollup": ("score_rollups", "main", "Merge score rollups and write per-council and per-DataZone tables")
+}
+
+# Modules timed by the benchmark command, in pipeline order
+BENCHMARK_MODULES = [
+    "spatial_intersection_analysis",
+    "merge_csv_data",
+    "normalize",
+    "generate_scored_lands",
+    "streaming_pipeline",
+    "partitioned_scoring",
+    "query_scored_lands",
+    "reweight_scores",
+    "sensitivity_analysis",
+    "datazone_lookup",
+    "score_rollups"
+]
+
+def _import_stage(module_name):
+    if PROCESSING_DIR not in sys.path:
+        sys.path.insert(0, PROCESSING_DIR)
+    import importlib
+    return importlib.import_module(module_name)
+
+def council_areas(args):
+    _import_stage("spatial_intersection_analysis").main(args.datazones, args.councilzones, args.output)
+
+def rename_fields(args):
+    _import_stage("rename_fields").rename_fields(args.input, args.output)
+
+def merge_csv(args):
+    _import_stage("merge_csv_data").main(args.geojson, args.csv_folder, args.output)
+
+def averages(args):
+    _import_stage("calculate_averages").calculate_averages(args.input, args.output)
+
+def normalize(args):
+    _import_stage("normalize").normalize_geojson_features(
+        args.input,
+        args.output,
+        exclude_fields=["CouncilArea", "2011Zones", "DataZone", "geometry"],
+        method=args.method,
+        quantile_range=(0.1, 0.9),
+        prefix="norm"
+    )
+
+def area(args):
+    _import_stage("area").add_id_and_area(args.input, args.output)
+
+def measure_import(module_name):
+    """
+    Time importing a module in a fresh interpreter.
+
+    Args:
+        module_name (str): Module in the processing directory
+
+    Returns:
+        float: Import time in seconds
+    """
+    code = ("import sys, time; sys.path.insert(0, sys.argv[1]); start = time.perf_counter(); "
+            f"import {module_name}; print(time.perf_counter() - start)")
+    output = subprocess.run([sys.executable, "-c", code, PROCESSING_DIR], capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def measure_command(arguments):
+    """
+    Time running this CLI with the given arguments, interpreter start-up included.
+
+    Args:
+        arguments (list): Command line arguments
+
+    Returns:
+        float: Wall time in seconds
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(__file__)] + arguments, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+def benchmark(args):
+    print("Import time per stage module (fresh interpreter):")
+    for module_name in BENCHMARK_MODULES:
+        try:
+            print(f"  {module_name:<32} {measure_import(module_name) * 1000:8.1f} ms")
+        except subprocess.CalledProcessError as e:
+            print(f"  {module_name:<32} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+
+    print("Command time (interpreter start-up included):")
+    commands = [["--help"], ["score", "--help"], ["stream", "--help"], ["query", "--help"], ["partition", "--help"]]
+    commands += [command.split() for command in args.command]
+    for arguments in commands:
+        try:
+            print(f"  {' '.join(arguments):<32} {measure_command(arguments) * 1000:8.1f} ms")
+        except subprocess.CalledProcessError:
+            print(f"  {' '.join(arguments):<32} failed")
+    print("Run with python -X importtime for a per-package breakdown.")
+
+def build_parser():
+    """
+    Build the argument parser for the commands implemented here.
+
+    Returns:
+        ArgumentParser: Parser with one subcommand per stage
+    """
+    parser = argparse.ArgumentParser(description="Empty lands data processing.",
+                                     epilog="Run '<command> --help' for the options of a command.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    council_parser = subparsers.add_parser("council-areas", help="Assign council areas to data zones")
+    council_parser.add_argument("--datazones", default="./00-data/geojson/datazones2011.geojson")
+    council_parser.add_argument("--councilzones", default="./00-data/geojson/councilzones.geojson")
+    council_parser.add_argument("--output", default="./00-data/geojson/datazones2011_with_local_auth.geojson")
+    council_parser.set_defaults(handler=council_areas)
+
+    rename_parser = subparsers.add_parser("rename-fields", help="Rename and drop data zone fields")
+    rename_parser.add_argument("--input", default="./00-data/geojson/datazones2011_with_local_auth.geojson")
+    rename_parser.add_argument("--output", help="Output GeoJSON (default: input name with a _removed suffix)")
+    rename_parser.set_defaults(handler=rename_fields)
+
+    merge_parser = subparsers.add_parser("merge-csv", help="Join CSV metrics onto the data zones")
+    merge_parser.add_argument("--geojson", default="./00-data/geojson/datazones2011_with_local_auth_removed.geojson")
+    merge_parser.add_argument("--csv-folder", default="./00-data/csv")
+    merge_parser.add_argument("--output", default="./00-data/geojson/datazones2011_enriched.geojson")
+    merge_parser.set_defaults(handler=merge_csv)
+
+    averages_parser = subparsers.add_parser("averages", help="Average a CSV's Value column per Name")
+    averages_parser.add_argument("--input", default="./00-data/csv/key-services-travel-time.csv")
+    averages_parser.add_argument("--output", default="./00-data/csv/key-services-travel-time-average.csv")
+    averages_parser.set_defaults(handler=averages)
+
+    normalize_parser = subparsers.add_parser("normalize", help="Add normalized norm_ metric properties")
+    normalize_parser.add_argument("--input", default="./00-data/geojson/datazones2011_data.geojson")
+    normalize_parser.add_argument("--output", default="./00-data/geojson/datazones2011_data_normalized.geojson")
+    normalize_parser.add_argument("--method", choices=["minmax", "robust", "zscore", "quantile"], default="robust")
+    normalize_parser.set_defaults(handler=normalize)
+
+    area_parser = subparsers.add_parser("area", help="Add ids and areas to the normalized data zones")
+    area_parser.add_argument("--input", default="./00-data/geojson/datazones2011_data_normalized.geojson")
+    area_parser.add_argument("--output",
+                             default="./00-data/geojson/datazones2011_data_normalized_with_id_area.geojson")
+    area_parser.set_defaults(handler=area)
+
+    # Listed for help only; their arguments are parsed by the stage module
+    for command, (_, _, help_text) in PASSTHROUGH_COMMANDS.items():
+        subparsers.add_parser(command, help=help_text, add_help=False)
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Measure import and start-up times")
+    benchmark_parser.add_argument("--command", action="append", default=[],
+                                  help="Extra command line to time, e.g. 'query top -k 10'")
+    benchmark_parser.set_defaults(handler=benchmark)
+
+    return parser
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv and argv[0] in PASSTHROUGH_COMMANDS:
+        module_name, entry_point, _ = PASSTHROUGH_COMMANDS[argv[0]]
+        getattr(_import_stage(module_name), entry_point)(argv[1:])
+        return
+
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import json
+import os
+import numpy as np
+
+# Target number of datazones per lookup grid cell
+ZONES_PER_CELL = 8
+
+def lookup_grid(lon, lat, zones_per_cell=ZONES_PER_CELL):
+    """
+    Bucket points into a uniform lon/lat grid.
+
+    Args:
+        lon (ndarray): Point longitudes
+        lat (ndarray): Point latitudes
+        zones_per_cell (int): Target number of points per cell
+
+    Returns:
+        tuple: (grid, order, cell_start) where grid describes the cells,
+            order sorts the points by cell and cell_start holds each cell's
+            first position in that order, plus a final end offset
+    """
+    n = len(lon)
+    if n > 0:
+        west, south, east, north = float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())
+    else:
+        west, south, east, north = 0.0, 0.0, 0.0, 0.0
+    width, height = max(east - west, 1e-9), max(north - south, 1e-9)
+    cell_size = max(float(np.sqrt(width * height / max(1, n // zones_per_cell))), 1e-6)
+    columns = int(np.ceil(width / cell_size)) or 1
+    rows = int(np.ceil(height / cell_size)) or 1
+
+    cell_x = np.clip(((lon - west) / cell_size).astype(np.int64), 0, columns - 1)
+    cell_y = np.clip(((lat - south) / cell_size).astype(np.int64), 0, rows - 1)
+    cell = cell_y * columns + cell_x
+    order = np.argsort(cell, kind="stable")
+    cell_start = np.zeros(columns * rows + 1, dtype=np.uint32)
+    np.cumsum(np.bincount(cell, minlength=columns * rows), out=cell_start[1:])
+
+    grid = {"west": west, "south": south, "cell_size": cell_size, "columns": columns, "rows": rows}
+    return grid, order, cell_start
+
+def export_datazone_lookup(datazones_gdf, output_prefix, zones_per_cell=ZONES_PER_CELL):
+    """
+    Export a compact datazone lookup for the interactive map.
+
+    Writes <output_prefix>.bin with little-endian typed arrays and
+    <output_prefix>.json describing them. Datazones are stored in grid cell
+    order, so the zones of a cell are one contiguous slice:
+
+        lon, lat        float32 per zone, area centroid in EPSG:4326
+        cell_start      uint32 per cell plus one, offset of each cell's first zone
+        council         int32 per zone, index into "councils" or -1
+        raw, norm       float32 zones x metrics, row-major, NaN where missing
+
+    Args:
+        datazones_gdf (GeoDataFrame): Normalized datazones
+        output_prefix (str): Path of the output files without extension
+        zones_per_cell (int): Target number of zones per grid cell
+
+    Returns:
+        dict: The lookup metadata
+    """
+    import pyproj
+    from datazone_table import DatazoneTable
+    from geometry_metrics import centroid_coordinates
+
+    table = DatazoneTable(datazones_gdf)
+    transformer = pyproj.Transformer.from_crs(table.crs, "EPSG:4326", always_xy=True)
+    lon, lat = transformer.transform(*centroid_coordinates(table.geometries))
+    lon, lat = np.asarray(lon), np.asarray(lat)
+
+    grid, order, cell_start = lookup_grid(lon, lat, zones_per_cell)
+
+    arrays = [
+        ("lon", lon[order].astype("<f4")),
+        ("lat", lat[order].astype("<f4")),
+        ("cell_start", cell_start.astype("<u4")),
+        ("council", table.council_codes[order].astype("<i4")),
+        ("raw", np.ascontiguousarray(table.raw[order]).astype("<f4")),
+        ("norm", np.ascontiguousarray(table.norm[order]).astype("<f4"))
+    ]
+
+    layout = {}
+    offset = 0
+    with open(f"{output_prefix}.bin", "wb") as f:
+        for name, values in arrays:
+            # Every array is 4-byte aligned, so the browser can view it in place
+            layout[name] = {"offset": offset, "length": int(values.size), "type": values.dtype.name}
+            f.write(values.tobytes())
+            offset += values.nbytes
+
+    zone_names = table.zone_names
+    meta = {
+        "count": len(table),
+        "metrics": table.metrics,
+        "grid": grid,
+        "arrays": layout,
+        "zones": [str(zone_names[code]) if code >= 0 else None for code in table.zone_codes[order]]
+                 if zone_names is not None else None,
+        "councils": [str(name) for name in table.council_names] if table.council_names is not None else []
+    }
+    with open(f"{output_prefix}.json", "w") as f:
+        json.dump(meta, f)
+
+    print(f"Exported {len(table)} datazones with {len(table.metrics)} metrics in a "
+          f"{grid['columns']} x {grid['rows']} grid to {output_prefix}.bin ({offset / 1e6:.2f} MB)")
+    return meta
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Export a compact datazone lookup for isochrone analysis.")
+    parser.add_argument("--datazones", default="./00-data/geojson/datazones2011_data_normalized.geojson")
+    parser.add_argument("--output", default="./00-data/geojson/datazone-lookup",
+                        help="Output path without extension; writes .bin and .json")
+    parser.add_argument("--zones-per-cell", type=int, default=ZONES_PER_CELL)
+    args = parser.parse_args(argv)
+
+    import geopandas as gpd
+    print(f"Loading datazones from {args.datazones}...")
+    datazones_gdf = gpd.read_file(args.datazones)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    export_datazone_lookup(datazones_gdf, args.output, args.zones_per_cell)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import threading
+import uuid
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import shapely
+from geometry_metrics import PROJECTED_CRS, projected_geometry_array
+from scoring_model import all_metrics
+
+# Default number of catchments kept by a CatchmentMemo
+MEMO_SIZE = 50000
+
+class DatazoneTable:
+    """
+    Compact, picklable view of the datazones used for scoring.
+
+    Holds the metric columns as contiguous float32 matrices and the DataZone
+    and CouncilArea identifiers as integer codes, instead of a full
+    GeoDataFrame with float64 and object columns. The spatial index is built
+    lazily and is not pickled, so each worker builds its own.
+    """
+
+    def __init__(self, datazones_gdf, metrics=None):
+        """
+        Args:
+            datazones_gdf (GeoDataFrame): Datazones in any CRS
+            metrics (list): Metric names to keep, defaults to all scoring metrics
+        """
+        if metrics is None:
+            metrics = all_metrics()
+
+        # Only keep metrics that have normalized values
+        self.metrics = [m for m in metrics if f"norm_{m}" in datazones_gdf.columns]
+        self.geometries = projected_geometry_array(datazones_gdf, PROJECTED_CRS)
+        self.crs = PROJECTED_CRS
+
+        n = len(datazones_gdf)
+        self.norm = np.full((n, len(self.metrics)), np.nan, dtype=np.float32)
+        self.raw = np.full((n, len(self.metrics)), np.nan, dtype=np.float32)
+        for j, metric in enumerate(self.metrics):
+            self.norm[:, j] = pd.to_numeric(datazones_gdf[f"norm_{metric}"], errors="coerce").to_numpy(dtype=np.float32)
+            if metric in datazones_gdf.columns:
+                self.raw[:, j] = pd.to_numeric(datazones_gdf[metric], errors="coerce").to_numpy(dtype=np.float32)
+
+        self.zone_codes, self.zone_names = self._factorize(datazones_gdf, "DataZone", n)
+        self.council_codes, self.council_names = self._factorize(datazones_gdf, "CouncilArea", n)
+        # Row numbers in the full table and a table identity, so subsets
+        # share catchment keys but different tables never do
+        self.rows = np.arange(n, dtype=np.int32)
+        self.token = uuid.uuid4().bytes
+        self._tree = None
+
+    @staticmethod
+    def _factorize(datazones_gdf, column, n):
+        if column not in datazones_gdf.columns:
+            return np.full(n, -1, dtype=np.int32), None
+        codes, uniques = pd.factorize(datazones_gdf[column])
+        return codes.astype(np.int32), pd.Index(uniques)
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_tree"] = None
+        return state
+
+    @property
+    def tree(self):
+        """STRtree over the datazone geometries, built on first use."""
+        return self.ensure_tree()
+
+    def ensure_tree(self):
+        """
+        Build the STRtree now if it is not built yet.
+
+        Call this before sharing the table between threads, so they do not
+        each build their own tree on first use.
+
+        Returns:
+            STRtree: The spatial index
+        """
+        if self._tree is None:
+            self._tree = shapely.STRtree(self.geometries)
+        return self._tree
+
+    @property
+    def nbytes(self):
+        """Size of the metric matrices and code arrays in bytes."""
+        return self.norm.nbytes + self.raw.nbytes + self.zone_codes.nbytes + self.council_codes.nbytes
+
+    def subset(self, rows):
+        """
+        Take a subset of datazones, keeping the global identifier codes.
+
+        Args:
+            rows (ndarray): Row numbers to keep
+
+        Returns:
+            DatazoneTable: Table with only the given rows
+        """
+        table = DatazoneTable.__new__(DatazoneTable)
+        table.__dict__.update(self.__getstate__())
+        table.geometries = self.geometries[rows]
+        table.norm = self.norm[rows]
+        table.raw = self.raw[rows]
+        table.zone_codes = self.zone_codes[rows]
+        table.council_codes = self.council_codes[rows]
+        table.rows = self.rows[rows]
+        return table
+
+    def halo_subset(self, centroids, radius):
+        """
+        Take the datazones that any buffer around the given points can reach.
+
+        Args:
+            centroids (ndarray): (n x 2) array of projected points
+            radius (float): Buffer radius in meters
+
+        Returns:
+            DatazoneTable: Datazones intersecting the points' bounding box plus the radius
+        """
+        if len(centroids) == 0:
+            return self.subset(np.empty(0, dtype=np.int64))
+        minx, miny = centroids.min(axis=0) - radius
+        maxx, maxy = centroids.max(axis=0) + radius
+        rows = np.sort(self.tree.query(shapely.box(minx, miny, maxx, maxy), predicate="intersects"))
+        return self.subset(rows)
+
+    def catchment_keys(self, rows, starts, ends):
+        """
+        Canonical keys for catchments, the same for any subset of the table.
+
+        Args:
+            rows (ndarray): Row numbers of all catchments' datazones, each
+                catchment's rows sorted and stored contiguously
+            starts (ndarray): Start of each catchment in rows
+            ends (ndarray): End of each catchment in rows
+
+        Returns:
+            list: One bytes key per catchment identifying its set of datazones
+        """
+        data = self.rows[rows].tobytes()
+        itemsize = self.rows.itemsize
+        return [self.token + data[start * itemsize:end * itemsize] for start, end in zip(starts, ends)]
+
+    def catchment_aggregates(self, rows, starts):
+        """
+        Aggregate many catchments in one pass, ignoring missing values.
+
+        Args:
+            rows (ndarray): Row numbers of all catchments' datazones, each
+                catchment's rows stored contiguously
+            starts (ndarray): Start of each catchment in rows; catchments are not empty
+
+        Returns:
+            tuple: (norm_means, raw_means), (catchments x metrics) float32
+                means, NaN where a metric had no values
+        """
+        return _segment_nan_means(self.norm[rows], starts), _segment_nan_means(self.raw[rows], starts)
+
+    def containing_codes(self, centroids, max_distance=None):
+        """
+        DataZone and CouncilArea codes of the datazone each point lies in.
+
+        This is the one definition of a plot's DataZone and CouncilArea, shared
+        by the exact and approximate engines and the rollups keyed on them.
+        Points on a shared boundary or outside every datazone (e.g. on the
+        coast) take the nearest datazone within max_distance; ties go to the
+        lowest row, so any halo subset of the table gives the same answer.
+
+        Args:
+            centroids (ndarray): (n x 2) array of projected points
+            max_distance (float): Farthest datazone a point outside all of them
+                can take, unlimited if None
+
+        Returns:
+            tuple: (zone_codes, council_codes) int32 arrays, -1 for none
+        """
+        points = shapely.points(centroids)
+        zone_rows = np.full(len(points), -1, dtype=np.int64)
+        if len(points) == 0 or len(self) == 0:
+            return zone_rows.astype(np.int32), zone_rows.astype(np.int32)
+
+        point_idx, row_idx = self.tree.query(points, predicate="within")
+        outside = np.setdiff1d(np.arange(len(points)), point_idx)
+        if len(outside):
+            nearest_idx, nearest_rows = self.tree.query_nearest(points[outside], max_distance=max_distance,
+                                                                all_matches=True)
+            point_idx = np.concatenate([point_idx, outside[nearest_idx]])
+            row_idx = np.concatenate([row_idx, nearest_rows])
+
+        # Write the highest rows first so the lowest row of each point wins
+        order = np.argsort(row_idx, kind="stable")[::-1]
+        zone_rows[point_idx[order]] = row_idx[order]
+
+        found = zone_rows >= 0
+        zone_codes = np.where(found, self.zone_codes[np.maximum(zone_rows, 0)], -1).astype(np.int32)
+        council_codes = np.where(found, self.council_codes[np.maximum(zone_rows, 0)], -1).astype(np.int32)
+        return zone_codes, council_codes
+
+class CatchmentMemo:
+    """
+    Bounded LRU memo of catchment aggregates keyed by datazone set.
+
+    Neighbouring plots often reach exactly the same datazones, so their
+    aggregates only need computing once. Safe to share between threads.
+    """
+
+    def __init__(self, maxsize=MEMO_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for a key, or None, counting hits and misses."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Hit and miss counts so far."""
+        return {"hits": self.hits, "misses": self.misses}
+
+def _segment_nan_means(values, starts):
+    present = ~np.isnan(values)
+    means = np.full((len(starts), values.shape[1]), np.nan, dtype=np.float32)
+    if len(starts) == 0:
+        return means
+    counts = np.add.reduceat(present.astype(np.int32), starts, axis=0)
+    sums = np.add.reduceat(np.where(present, values, 0).astype(np.float64), starts, axis=0)
+    np.divide(sums, counts, out=means, where=counts > 0, casting="unsafe")
+    return means
+
+def codes_to_categorical(codes, names):
+    """
+    Turn codes into a pandas Categorical without materializing strings.
+
+    Args:
+        codes (ndarray): Integer codes, -1 for missing
+        names (Index): Category names for the codes
+
+    Returns:
+        Categorical: Categorical column, or None if there are no names
+    """
+    if names is None:
+        return None
+    return pd.Categorical.from_codes(codes, categories=names)
@@ -1,54 +1,74 @@
 import os
+import argparse
 import json
+import threading
 import time
-import requests
-import geopandas as gpd
-import pandas as pd
-from shapely.geometry import Point, Polygon, shape
-from shapely.ops import transform
-import pyproj
-from functools import partial
 import numpy as np
-from tqdm import tqdm
 import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from osm_pbf import read_pbf_empty_lands, set_pool_threads
+from plot_ordering import spatial_order
+from grid_scoring import GRID_RESOLUTION, approximate_catchments, compare_with_exact
+from query_scored_lands import build_index_from_frame
+from scoring_model import CATEGORIES, all_metrics, save_metric_means, score_matrix
+
+# pandas, geopandas, shapely and the modules built on them are imported where
+# they are used, so that importing this module for its helpers or --help
+# stays cheap.
+
+# Catchment aggregates memoized per worker process, shared by its chunks;
+# created on first use by _get_catchment_memo
+_catchment_memo = None
+_catchment_memo_lock = threading.Lock()
+
+# Largest run scored with the thread backend when the backend is "auto". The
+# buffer and intersection query take most of a chunk's time and release the
+# GIL, but the per-plot memo lookups hold it, so threads scale less than
+# processes; below this size that costs less than starting worker processes
+# and pickling their datazone subsets.
+THREAD_BACKEND_MAX_PLOTS = 20000
 
 def query_overpass_api(osm_bounding_zone="55.5,-4.8,56.0,-2.8"):
     """
     Query Overpass API for empty lands in the specified bounding box.
     
     Args:
-        bbox (str): Bounding box in format "south,west,north,east"
+        osm_bounding_zone (str): Bounding box in format "south,west,north,east"
     
     Returns:
         dict: JSON response from Overpass API
     """
+    import requests
+
     print("Querying Overpass API for empty lands...")
     
+    # Overpass QL bounding box filter, "(south,west,north,east)"
+    bbox_filter = f"({osm_bounding_zone})"
+    
     # Overpass query for empty lands (landuse=brownfield, landuse=vacant, etc.)
     overpass_query = f"""
     [out:json][timeout:300];
     (
         // Railway-related and disused/abandoned lands
-        way["railway"]["disused"="yes"]${osm_bounding_zone};
-        way["landuse"="railway"]${osm_bounding_zone};
-        way["disused"="yes"]${osm_bounding_zone};
-        way["abandoned"="yes"]${osm_bounding_zone};
-        way["abandoned:landuse"]${osm_bounding_zone};
-        way["disused:landuse"]${osm_bounding_zone};
+        way["railway"]["disused"="yes"]{bbox_filter};
+        way["landuse"="railway"]{bbox_filter};
+        way["disused"="yes"]{bbox_filter};
+        way["abandoned"="yes"]{bbox_filter};
+        way["abandoned:landuse"]{bbox_filter};
+        way["disused:landuse"]{bbox_filter};
 
         // Brownfield, greenfield, vacant, construction, landfill, etc.
-        way["landuse"~"brownfield|greenfield|vacant|construction|landfill"]${osm_bounding_zone};
-        way["brownfield"="yes"]${osm_bounding_zone};
-        way["vacant"="yes"]${osm_bounding_zone};
+        way["landuse"~"brownfield|greenfield|vacant|construction|landfill"]{bbox_filter};
+        way["brownfield"="yes"]{bbox_filter};
+        way["vacant"="yes"]{bbox_filter};
 
         // Network Rail properties
-        way["operator"~"Network Rail|network rail"]${osm_bounding_zone};
-        way["owner"~"Network Rail|network rail"]${osm_bounding_zone};
+        way["operator"~"Network Rail|network rail"]{bbox_filter};
+        way["owner"~"Network Rail|network rail"]{bbox_filter};
 
         // Also search for nodes and relations
-        node["landuse"~"brownfield|greenfield|vacant|construction|landfill"]${osm_bounding_zone};
-        relation["landuse"~"brownfield|greenfield|vacant|construction|landfill"]${osm_bounding_zone};
+        node["landuse"~"brownfield|greenfield|vacant|construction|landfill"]{bbox_filter};
+        relation["landuse"~"brownfield|greenfield|vacant|construction|landfill"]{bbox_filter};
         );
     out body;
     >;
@@ -133,367 +153,666 @@ def calculate_buffer_radius(minutes, speed_meters_per_minute=80):
     """
     return minutes * speed_meters_per_minute
 
-def calculate_plot_score(intersecting_datazones):
+def extract_metric_means(scored_lands_gdf):
     """
-    Calculate plot score based on intersecting datazones.
+    Collect each plot's normalized catchment means into a float32 matrix.
     
     Args:
-        intersecting_datazones (GeoDataFrame): Datazones that intersect with the buffer
+        scored_lands_gdf (GeoDataFrame): Scored empty lands
     
     Returns:
-        dict: Score data with overall score and flattened metrics
-    """
-    # Define categories and metrics
-    categories = [
-        {
-            "heading": "Eradicating_Child_Poverty",
-            "metrics": [
-                "HEALTH OUTCOMES",
-                "CHILDREN IN FAMILIES WITH LIMITED RESOURCES",
-                "CHILD BENEFIT"
-            ]
-        },
-        {
-            "heading": "Growing_the_Economy",
-            "metrics": [
-                "INDEX OF MULTIPLE DEPRIVATION",
-                "BUSINESS DEMOGRAPHY",
-                "ECONOMIC ACTIVITY",
-                "HOUSE SALES PRICE",
-                "EARNINGS",
-                "UNDEREMPLOYMENT"
-            ]
-        },
-        {
-            "heading": "Tackling_the_Climate_Emergency",
-            "metrics": [
-                "CAR OWNERSHIP",
-                "HOUSING QUALITY",
-                "ENERGY CONSUMPTION",
-                "POPULATION ESTIMATES"
-            ]
-        },
-        {
-            "heading": "Ensuring_High_Quality_and_Sustainable_Public_Services",
-            "metrics": [
-                "LOCAL SERVICE SATISFACTION",
-                "ACCESS TO PUBLIC TRANSPORT",
-                "BUS ACCESSIBILITY",
-                "GEOGRAPHIC ACCESS TO SERVICES INDICATOR"
-            ]
-        }
-    ]
-    
-    # Define metrics with negative impact (where higher values are worse)
-    negative_impact_metrics = [
-        "norm_CHILDREN IN FAMILIES WITH LIMITED RESOURCES",
-        "norm_INDEX OF MULTIPLE DEPRIVATION",
-        "norm_ENERGY CONSUMPTION",
-        "norm_CHILD BENEFIT",
-        "norm_HEALTH OUTCOMES",
-        "norm_GEOGRAPHIC ACCESS TO SERVICES INDICATOR"
-    ]
-    
-    if len(intersecting_datazones) == 0:
-        return {
-            "overallScore": 0,
-            "datazonesCount": 0
-        }
+        tuple: (norm_means, metrics) with NaN where a metric had no values;
+            per-plot metrics are only listed when the plots were scored on them
+    """
+    import pandas as pd
+
+    metrics = all_metrics()
+    metrics += [m for m in all_metrics(plot_metrics=True)[len(metrics):] if f"norm_{m}" in scored_lands_gdf.columns]
+    norm_means = np.full((len(scored_lands_gdf), len(metrics)), np.nan, dtype=np.float32)
     
-    # Initialize result dictionary
-    result = {
-        "overallScore": 0,
-        "datazonesCount": len(intersecting_datazones)
-    }
+    for j, metric in enumerate(metrics):
+        norm_key = f"norm_{metric}"
+        if norm_key in scored_lands_gdf.columns:
+            norm_means[:, j] = pd.to_numeric(scored_lands_gdf[norm_key], errors="coerce").to_numpy(dtype=np.float32)
     
-    # Initialize category scores
-    category_scores = {}
-    for category in categories:
-        category_scores[category["heading"]] = {
-            "score": 0,
-            "count": 0
-        }
+    return norm_means, metrics
+
+def build_score_columns(table, norm_means, raw_means, counts, zone_codes, council_codes, features=None):
+    """
+    Turn per-plot catchment aggregates into output score columns.
     
-    # Calculate scores for each metric
-    total_score = 0
-    total_metrics_count = 0
+    Per-plot features such as station proximity are scored next to the
+    datazone metrics when they have a norm_ column for a metric in PLOT_METRICS;
+    their other columns are passed through.
     
-    # List of all metrics we want to include
-    all_metrics = []
-    for category in categories:
-        all_metrics.extend(category["metrics"])
+    Args:
+        table (DatazoneTable): Datazones the aggregates were computed from
+        norm_means (ndarray): (plots x metrics) normalized catchment means
+        raw_means (ndarray): (plots x metrics) raw catchment means
+        counts (ndarray): Number of datazones in each catchment
+        zone_codes (ndarray): DataZone code per plot from DatazoneTable.containing_codes, -1 for none
+        council_codes (ndarray): CouncilArea code per plot, likewise
+        features (DataFrame): Optional per-plot feature columns, one row per plot
     
-    # Add raw values for each metric
-    for metric in all_metrics:
-        norm_key = f"norm_{metric}"
-        
-        # Skip if the normalized metric doesn't exist in the dataframe
-        if norm_key not in intersecting_datazones.columns:
-            continue
-        
-        # Calculate average normalized value for this metric
-        norm_values = intersecting_datazones[norm_key].dropna()
-        
-        # Get raw values if they exist
-        if metric in intersecting_datazones.columns:
-            raw_values = intersecting_datazones[metric].dropna()
-            if len(raw_values) > 0:
-                result[metric] = float(raw_values.mean())
-        
-        # Add normalized values
-        if len(norm_values) > 0:
-            result[norm_key] = float(norm_values.mean())
-            
-            # Calculate metric score for overall score
-            is_negative = norm_key in negative_impact_metrics
-            metric_score = (1 - result[norm_key]) if is_negative else result[norm_key]
-            
-            total_score += metric_score
-            total_metrics_count += 1
-            
-            # Find which category this metric belongs to and update its score
-            for category in categories:
-                if metric in category["metrics"]:
-                    cat_key = category["heading"]
-                    category_scores[cat_key]["score"] += metric_score
-                    category_scores[cat_key]["count"] += 1
-                    break
-    
-    # Calculate overall score
-    if total_metrics_count > 0:
-        result["overallScore"] = float(total_score / total_metrics_count)
-    
-    # Calculate category scores and add them to the result
-    for cat_key, cat_data in category_scores.items():
-        if cat_data["count"] > 0:
-            result[cat_key] = float(cat_data["score"] / cat_data["count"])
-    
-    # Add DataZone if available
-    if "DataZone" in intersecting_datazones.columns:
-        # Get the most common datazone
-        result["DataZone"] = intersecting_datazones["DataZone"].value_counts().index[0]
-    
-    return result
+    Returns:
+        dict: Column name to array, in output column order
+    """
+    from datazone_table import codes_to_categorical
 
-def process_land_chunk(chunk_data):
+    metrics = list(table.metrics)
+    extra_columns = {}
+    if features is not None:
+        feature_metrics = [m for m in all_metrics(plot_metrics=True) if m not in metrics and f"norm_{m}" in features.columns]
+        feature_columns = [f"norm_{m}" for m in feature_metrics]
+        norm_means = np.column_stack([norm_means, features[feature_columns].to_numpy(dtype=np.float32)])
+        raw_means = np.column_stack([raw_means, features[feature_metrics].to_numpy(dtype=np.float32)])
+        metrics += feature_metrics
+        for column in features.columns:
+            if column not in feature_metrics and column not in feature_columns:
+                extra_columns[column] = features[column].to_numpy()
+    
+    scores = score_matrix(norm_means, metrics)
+    
+    columns = {
+        "overallScore": scores.pop("overallScore"),
+        "datazonesCount": counts
+    }
+    for j, metric in enumerate(metrics):
+        columns[metric] = raw_means[:, j]
+        columns[f"norm_{metric}"] = norm_means[:, j]
+    columns.update(scores)
+    columns.update(extra_columns)
+    
+    for name, codes, names in [("DataZone", zone_codes, table.zone_names),
+                               ("CouncilArea", council_codes, table.council_names)]:
+        categorical = codes_to_categorical(codes, names)
+        if categorical is not None:
+            columns[name] = categorical
+    
+    return columns
+
+def report_memo_stats(results):
     """
-    Process a chunk of empty lands and calculate scores.
+    Print catchment memo hit and miss counts summed over chunk results.
     
     Args:
-        chunk_data (tuple): Tuple containing (chunk_df, datazones_gdf, buffer_radius, start_index)
+        results (list): Score frames returned by process_land_chunk
     
     Returns:
-        GeoDataFrame: Processed chunk with scores
+        dict: Total hits and misses
     """
-    chunk_df, datazones_gdf, buffer_radius, start_index = chunk_data
+    totals = {"hits": 0, "misses": 0}
+    for scores_df in results:
+        for key, value in scores_df.attrs.get("catchment_memo", {}).items():
+            totals[key] += value
+    lookups = totals["hits"] + totals["misses"]
+    if lookups:
+        print(f"Catchment memo: {totals['hits']} hits, {totals['misses']} misses "
+              f"({100 * totals['hits'] / lookups:.1f}% hit rate)")
+    return totals
+
+def _get_catchment_memo():
+    global _catchment_memo
+    with _catchment_memo_lock:
+        if _catchment_memo is None:
+            from datazone_table import CatchmentMemo
+            _catchment_memo = CatchmentMemo()
+        return _catchment_memo
+
+def process_land_chunk(chunk_data):
+    """
+    Process a chunk of empty lands and calculate scores.
     
-    # Create a spatial index for datazones
-    datazones_sindex = datazones_gdf.sindex
+    Walking-distance buffers and the datazone intersection test run as one
+    vectorized query for the whole chunk. Plots with the same set of catchment
+    datazones share one memoized aggregate; the sets missing from the memo are
+    aggregated together in one batch, so the only per-plot Python is the memo
+    lookup. The chunk's memo hit and miss counts are in the frame's
+    attrs["catchment_memo"].
     
-    # Process each empty land in the chunk
-    for i, (idx, row) in enumerate(chunk_df.iterrows()):
-        # Add index ID
-        chunk_df.at[idx, 'id'] = start_index + i
-        
-        # Calculate area in square meters if not present
-        if 'area' not in chunk_df.columns:
-            chunk_df.at[idx, 'area'] = int(row.geometry.area)
-        
-        # Calculate centroid
-        centroid = row.geometry.centroid
-        
-        # Create buffer around centroid (simulating walking distance)
-        buffer = centroid.buffer(buffer_radius)
+    Args:
+        chunk_data (tuple): Tuple containing (centroids, datazone_table, buffer_radius, positions, features),
+            where centroids is an (n x 2) array of projected plot centroids,
+            positions are the plots' positions in the full input and features
+            are the plots' per-plot feature rows, or None
+    
+    Returns:
+        DataFrame: Score columns for the chunk, indexed by position in the full input
+    """
+    import pandas as pd
+    import shapely
+
+    centroids, table, buffer_radius, positions, features = chunk_data
+    
+    n = len(centroids)
+    n_metrics = len(table.metrics)
+    norm_means = np.full((n, n_metrics), np.nan, dtype=np.float32)
+    raw_means = np.full((n, n_metrics), np.nan, dtype=np.float32)
+    counts = np.zeros(n, dtype=np.int32)
+    
+    # Each plot is labelled with the datazone it lies in, not its catchment
+    zone_codes, council_codes = table.containing_codes(centroids, buffer_radius)
+    
+    # Create buffers around centroids (simulating walking distance), with the
+    # same circle resolution as Point.buffer
+    buffers = shapely.buffer(shapely.points(centroids), buffer_radius, quad_segs=16)
+    
+    # Find datazones that intersect with each buffer using spatial index
+    plot_idx, zone_idx = table.tree.query(buffers, predicate="intersects")
+    order = np.lexsort((zone_idx, plot_idx))
+    plot_idx, zone_idx = plot_idx[order], zone_idx[order]
+    boundaries = np.searchsorted(plot_idx, np.arange(n + 1))
+    
+    # Look up each plot's catchment in the memo; only this loop is per-plot Python
+    plots = np.flatnonzero(np.diff(boundaries))
+    counts[plots] = np.diff(boundaries)[plots]
+    keys = table.catchment_keys(zone_idx, boundaries[plots], boundaries[plots + 1])
+    memo = _get_catchment_memo()
+    hit_plots, hit_aggregates, missing = [], [], {}
+    for i, key in zip(plots, keys):
+        aggregates = memo.get(key)
+        if aggregates is None:
+            missing.setdefault(key, []).append(i)
+        else:
+            hit_plots.append(i)
+            hit_aggregates.append(aggregates)
+    memo_stats = {"hits": len(plots) - len(missing), "misses": len(missing)}
+    
+    if hit_plots:
+        norm_means[hit_plots] = [aggregates[0] for aggregates in hit_aggregates]
+        raw_means[hit_plots] = [aggregates[1] for aggregates in hit_aggregates]
+    
+    if missing:
+        # Aggregate every new datazone set in one batch, from its first plot's rows
+        first_plots = np.array([plot_list[0] for plot_list in missing.values()])
+        lengths = counts[first_plots]
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        rows = zone_idx[np.arange(lengths.sum()) + np.repeat(boundaries[first_plots] - starts, lengths)]
+        new_norm, new_raw = table.catchment_aggregates(rows, starts)
         
-        # Find datazones that intersect with this buffer using spatial index
-        possible_matches_idx = list(datazones_sindex.intersection(buffer.bounds))
+        for k, key in enumerate(missing):
+            memo.put(key, (new_norm[k].copy(), new_raw[k].copy()))
         
-        if possible_matches_idx:
-            possible_matches = datazones_gdf.iloc[possible_matches_idx]
-            # Use vectorized operation for intersection test
-            mask = possible_matches.intersects(buffer)
-            intersecting_datazones = possible_matches[mask]
-            
-            # Calculate score based on these datazones
-            score_data = calculate_plot_score(intersecting_datazones)
-            
-            # Add score data to the empty land's properties
-            for key, value in score_data.items():
-                chunk_df.at[idx, key] = value
-        else:
-            # No intersecting datazones
-            chunk_df.at[idx, 'overallScore'] = 0
-            chunk_df.at[idx, 'datazonesCount'] = 0
+        # Plots sharing a new datazone set get the same aggregates
+        owners = np.repeat(np.arange(len(missing)), [len(plot_list) for plot_list in missing.values()])
+        plot_rows = np.concatenate(list(missing.values()))
+        norm_means[plot_rows] = new_norm[owners]
+        raw_means[plot_rows] = new_raw[owners]
+    
+    columns = {"id": np.asarray(positions, dtype=np.int64)}
+    columns.update(build_score_columns(table, norm_means, raw_means, counts, zone_codes, council_codes,
+                                       features))
+    
+    scores_df = pd.DataFrame(columns, index=columns["id"])
+    scores_df.attrs["catchment_memo"] = memo_stats
+    return scores_df
+
+def attach_scores(empty_lands_gdf, plot_metrics, results):
+    """
+    Attach chunk results and geometry metrics to the empty lands in one step.
     
-    return chunk_df
+    Args:
+        empty_lands_gdf (GeoDataFrame): GeoDataFrame of empty lands
+        plot_metrics (DataFrame): Geometry metrics of the empty lands
+        results (list): Score frames indexed by position in empty_lands_gdf
+    
+    Returns:
+        GeoDataFrame: Empty lands with scores added, in their original CRS
+    """
+    import pandas as pd
 
-def process_empty_lands(empty_lands_gdf, datazones_gdf, walking_radius_minutes=15):
+    # Combine results in input order
+    scores_df = pd.concat(results).sort_index()
+    if len(scores_df) != len(empty_lands_gdf):
+        raise ValueError(f"Got scores for {len(scores_df)} of {len(empty_lands_gdf)} empty lands")
+    scores_df.index = empty_lands_gdf.index
+    
+    # Area in square meters and shape metrics, unless the input already has them
+    for column in ["perimeter", "compactness", "area"]:
+        if column not in empty_lands_gdf.columns:
+            values = plot_metrics[column].to_numpy()
+            if column == "area":
+                values = values.astype(np.int64)
+            scores_df.insert(1, column, values)
+    
+    return pd.concat([empty_lands_gdf, scores_df], axis=1)
+
+def select_backend(plot_count, backend="auto"):
+    """
+    Choose the parallel backend for a scoring run.
+    
+    Args:
+        plot_count (int): Number of plots to score
+        backend (str): "process", "thread" or "auto"
+    
+    Returns:
+        str: "process" or "thread"
+    """
+    if backend == "auto":
+        return "thread" if plot_count <= THREAD_BACKEND_MAX_PLOTS else "process"
+    if backend not in ("process", "thread"):
+        raise ValueError(f"Unknown scoring backend: {backend}")
+    return backend
+
+def process_empty_lands(empty_lands_gdf, datazones_gdf, walking_radius_minutes=15, ordering="hilbert",
+                        backend="auto", stations_gdf=None, rollups=None, projected=None):
     """
     Process empty lands and calculate scores based on surrounding datazones.
     Uses parallel processing to speed up calculations.
     
+    Plots are sorted along a space-filling curve before chunking, so each
+    chunk covers a compact area. Results are returned in the original plot
+    order.
+    
+    The process backend pickles each chunk with only the datazones near it to
+    worker processes. The thread backend shares one datazone table and spatial
+    index between threads. The buffer and intersection query, most of the
+    work, release the GIL, while the per-plot memo lookups hold it; the
+    backend starts instantly, so "auto" uses it for small runs.
+    
+    Per-council and per-DataZone score rollups are updated from each chunk's
+    scores as it completes, when a rollups dict is given.
+    
     Args:
         empty_lands_gdf (GeoDataFrame): GeoDataFrame of empty lands
         datazones_gdf (GeoDataFrame): GeoDataFrame of datazones
         walking_radius_minutes (int): Walking time in minutes
+        ordering (str): "hilbert", "zorder" or None to keep the input order
+        backend (str): "process", "thread" or "auto" to choose by input size
+        stations_gdf (GeoDataFrame): Optional railway stations to score proximity to
+        rollups (dict): Optional score rollups to update, see score_rollups.update_rollups
+        projected (ndarray): The plots' geometries already in PROJECTED_CRS,
+            projected here if None
     
     Returns:
-        GeoDataFrame: GeoDataFrame with scores added to properties
+        GeoDataFrame: GeoDataFrame with scores added to properties, in the input CRS
     """
+    from tqdm import tqdm
+    from datazone_table import DatazoneTable
+    from geometry_metrics import PROJECTED_CRS, geometry_metrics, projected_geometry_array
+    from score_rollups import update_rollups
+    from station_proximity import StationIndex, station_features
+
     print("Processing empty lands for static scoring...")
     
-    # Store original CRS for later conversion back
-    original_crs = empty_lands_gdf.crs
-    
-    # Ensure both GeoDataFrames are in the same CRS
-    if empty_lands_gdf.crs != datazones_gdf.crs:
-        empty_lands_gdf = empty_lands_gdf.to_crs(datazones_gdf.crs)
-    
     # Calculate buffer radius in meters
     buffer_radius = calculate_buffer_radius(walking_radius_minutes)
     
-    # Prepare datazones for faster processing
-    # Convert to projected CRS for more accurate spatial operations if not already
-    if datazones_gdf.crs == "EPSG:4326":
-        # Use a suitable projected CRS for your area
-        datazones_gdf = datazones_gdf.to_crs("EPSG:27700")  # British National Grid
-        empty_lands_gdf = empty_lands_gdf.to_crs("EPSG:27700")
-    
-    # Create spatial index for datazones if using rtree
-    print("Creating spatial index for datazones...")
-    
-    # Determine number of processes to use (leave one core free)
-    num_processes = max(1, multiprocessing.cpu_count() - 1)
-    print(f"Using {num_processes} processes for parallel processing")
-    
-    # Split the dataframe into chunks for parallel processing
-    chunk_size = max(1, len(empty_lands_gdf) // num_processes)
-    chunks = [empty_lands_gdf.iloc[i:i + chunk_size].copy() for i in range(0, len(empty_lands_gdf), chunk_size)]
-    
-    # Prepare arguments for parallel processing, including start index for each chunk
-    start_indices = [i * chunk_size for i in range(len(chunks))]
-    chunk_args = [(chunk, datazones_gdf, buffer_radius, start_idx) for chunk, start_idx in zip(chunks, start_indices)]
+    # Measure plots once in the projected CRS; results are attached to the
+    # input frame, so nothing has to be converted back afterwards
+    if projected is None:
+        projected = projected_geometry_array(empty_lands_gdf, PROJECTED_CRS)
+    plot_metrics = geometry_metrics(projected)
+    centroids = plot_metrics[["centroid_x", "centroid_y"]].to_numpy()
+    
+    # Pack datazones into a compact table; each worker builds its own spatial index
+    datazone_table = DatazoneTable(datazones_gdf)
+    print(f"Packed {len(datazone_table)} datazones into {datazone_table.nbytes / 1e6:.1f} MB of metric arrays")
+    
+    # Station proximity for all plots in one bulk query
+    features = station_features(centroids, StationIndex(stations_gdf), buffer_radius) if stations_gdf is not None else None
+    
+    backend = select_backend(len(centroids), backend)
+    if backend == "thread":
+        # One spatial index, built up front and shared by all threads
+        num_workers = multiprocessing.cpu_count()
+        datazone_table.ensure_tree()
+        executor_class = ThreadPoolExecutor
+    else:
+        # Leave one core free
+        num_workers = max(1, multiprocessing.cpu_count() - 1)
+        executor_class = ProcessPoolExecutor
+    print(f"Using {num_workers} {backend} workers for parallel processing")
+    
+    # Order plots along a space-filling curve so chunks are spatially compact
+    if ordering and len(centroids) > 0:
+        order = spatial_order(centroids[:, 0], centroids[:, 1], ordering)
+    else:
+        order = np.arange(len(centroids))
+    
+    # Split the plots into chunks; process chunks only carry the datazones within reach
+    chunk_size = max(1, len(centroids) // num_workers)
+    chunk_args = []
+    for start in range(0, len(centroids), chunk_size):
+        positions = order[start:start + chunk_size]
+        chunk_centroids = centroids[positions]
+        if backend == "thread":
+            chunk_table = datazone_table
+        else:
+            chunk_table = datazone_table.halo_subset(chunk_centroids, buffer_radius)
+        chunk_features = features.iloc[positions] if features is not None else None
+        chunk_args.append((chunk_centroids, chunk_table, buffer_radius, positions, chunk_features))
     
     # Process chunks in parallel
     results = []
-    with ProcessPoolExecutor(max_workers=num_processes) as executor:
+    with executor_class(max_workers=num_workers) as executor:
         futures = [executor.submit(process_land_chunk, arg) for arg in chunk_args]
         
         # Show progress
         for future in tqdm(as_completed(futures), total=len(futures), desc="Processing chunks"):
             results.append(future.result())
+            if rollups is not None:
+                update_rollups(rollups, results[-1])
     
-    # Combine results
-    if results:
-        combined_gdf = pd.concat(results)
-        
-        # Convert back to original CRS
-        if combined_gdf.crs != original_crs:
-            print(f"Converting results back to original CRS: {original_crs}")
-            combined_gdf = combined_gdf.to_crs(original_crs)
-        
-        return combined_gdf
-    else:
-        # If no results, convert empty_lands_gdf back to original CRS
-        if empty_lands_gdf.crs != original_crs:
-            empty_lands_gdf = empty_lands_gdf.to_crs(original_crs)
+    if not results:
         return empty_lands_gdf
+    
+    report_memo_stats(results)
+    return attach_scores(empty_lands_gdf, plot_metrics, results)
 
-def main():
-    """Main function to run the script."""
-    start_time = time.time()
+def process_empty_lands_approximate(empty_lands_gdf, datazones_gdf, walking_radius_minutes=15,
+                                    resolution=GRID_RESOLUTION, kernel="disk", sample_size=500, stations_gdf=None,
+                                    rollups=None, projected=None):
+    """
+    Score empty lands approximately from a rasterized datazone grid.
     
-    # Create output directory if it doesn't exist
-    os.makedirs("00-data", exist_ok=True)
-    os.makedirs("00-data/geojson", exist_ok=True)
+    Much faster than process_empty_lands for exploratory runs over very many
+    plots. The error against the exact engine is measured on a random sample
+    of plots, printed, and stored in the result's attrs["approximation_error"].
     
-    # Step 1: Query Overpass API for empty lands
+    Args:
+        empty_lands_gdf (GeoDataFrame): GeoDataFrame of empty lands
+        datazones_gdf (GeoDataFrame): GeoDataFrame of datazones
+        walking_radius_minutes (int): Walking time in minutes
+        resolution (float): Grid cell size in meters; smaller is more accurate but slower
+        kernel (str): "disk" for a round catchment, "square" for a summed-area table box
+        sample_size (int): Number of plots to check against the exact engine, 0 to skip
+        stations_gdf (GeoDataFrame): Optional railway stations to score proximity to
+        rollups (dict): Optional score rollups to update, see score_rollups.update_rollups
+        projected (ndarray): The plots' geometries already in PROJECTED_CRS,
+            projected here if None
+    
+    Returns:
+        GeoDataFrame: GeoDataFrame with scores added to properties, in the input CRS
+    """
+    import pandas as pd
+    from datazone_table import DatazoneTable
+    from geometry_metrics import PROJECTED_CRS, geometry_metrics, projected_geometry_array
+    from score_rollups import update_rollups
+    from station_proximity import StationIndex, station_features
+
+    print(f"Processing empty lands for approximate scoring at {resolution:g} m...")
+    
+    buffer_radius = calculate_buffer_radius(walking_radius_minutes)
+    if projected is None:
+        projected = projected_geometry_array(empty_lands_gdf, PROJECTED_CRS)
+    plot_metrics = geometry_metrics(projected)
+    centroids = plot_metrics[["centroid_x", "centroid_y"]].to_numpy()
+    datazone_table = DatazoneTable(datazones_gdf)
+    features = station_features(centroids, StationIndex(stations_gdf), buffer_radius) if stations_gdf is not None else None
+    
+    n = len(centroids)
+    aggregates = approximate_catchments(centroids, datazone_table, buffer_radius, resolution, kernel)
+    columns = {"id": np.arange(n, dtype=np.int64)}
+    columns.update(build_score_columns(datazone_table, *aggregates, features))
+    scores_df = pd.DataFrame(columns, index=columns["id"])
+    if rollups is not None:
+        update_rollups(rollups, scores_df)
+    
+    report = {}
+    if sample_size and n > 0:
+        # Score a random sample exactly and compare
+        sample = np.sort(np.random.default_rng(0).choice(n, min(sample_size, n), replace=False))
+        sample_features = features.iloc[sample] if features is not None else None
+        exact_df = process_land_chunk((centroids[sample], datazone_table, buffer_radius, sample, sample_features))
+        score_columns = ["overallScore"] + [category["heading"] for category in CATEGORIES]
+        report = compare_with_exact(scores_df.loc[sample], exact_df, score_columns, ["DataZone", "CouncilArea"])
+        print(f"Approximation error on {len(sample)} sampled plots:")
+        for column, errors in report.items():
+            if "agreement" in errors:
+                print(f"  {column}: {errors['agreement']:.1%} agree with the exact engine")
+            else:
+                print(f"  {column}: mean {errors['mean_abs_error']:.4f}, max {errors['max_abs_error']:.4f}, "
+                      f"rank correlation {errors['rank_correlation']:.3f}")
+    
+    scored_lands_gdf = attach_scores(empty_lands_gdf, plot_metrics, [scores_df])
+    scored_lands_gdf.attrs["approximation_error"] = report
+    return scored_lands_gdf
+
+def write_scored_lands(scored_lands_gdf, output_file):
+    """
+    Write the scored lands and the outputs later stages read next to them.
+    
+    Besides the GeoJSON at output_file, the per-plot metric means matrix is
+    saved as <name>-metrics.npz for re-weighting and sensitivity analysis,
+    and the query index as <name>.index. A failure writing the GeoJSON is
+    raised; failures in the other two are printed, as the GeoJSON is usable
+    without them.
+    
+    Args:
+        scored_lands_gdf (GeoDataFrame): Scored empty lands
+        output_file (str): Path of the output GeoJSON
+    """
+    # Explicitly include CRS in the GeoJSON
+    geo_json_dict = json.loads(scored_lands_gdf.to_json())
+    
+    # Add CRS information to the GeoJSON
+    if scored_lands_gdf.crs:
+        crs_name = scored_lands_gdf.crs.to_string()
+        geo_json_dict["crs"] = {
+            "type": "name",
+            "properties": {
+                "name": crs_name
+            }
+        }
+        print(f"Adding CRS to GeoJSON: {crs_name}")
+    
+    # Save to file
+    with open(output_file, "w") as f:
+        json.dump(geo_json_dict, f, indent=2)
+    
+    print(f"Successfully saved scored lands to {output_file}")
+    print(f"Total features: {len(scored_lands_gdf)}")
+    
+    output_stem = os.path.splitext(output_file)[0]
+    
+    # Persist per-plot metric means for instant re-weighting
     try:
-        # Check if we already have the data cached
-        if os.path.exists("00-data/empty-lands-raw.json"):
-            print("Loading empty lands from cache...")
-            with open("00-data/empty-lands-raw.json", "r") as f:
-                osm_data = json.load(f)
-        else:
-            # Query Overpass API
-            osm_data = query_overpass_api()
-            
-            # Save raw data for future use
-            with open("00-data/empty-lands-raw.json", "w") as f:
-                json.dump(osm_data, f)
+        means_file = f"{output_stem}-metrics.npz"
+        norm_means, metrics = extract_metric_means(scored_lands_gdf)
+        save_metric_means(means_file, scored_lands_gdf['id'], norm_means, metrics)
+        print(f"Saved metric means matrix {norm_means.shape} to {means_file}")
     except Exception as e:
-        print(f"Error querying Overpass API: {e}")
-        return
+        print(f"Error saving metric means: {e}")
     
-    # Step 2: Convert OSM data to GeoJSON
+    # Build the query index for top-K and filter queries
     try:
-        empty_lands_geojson = convert_osm_to_geojson(osm_data)
-        
-        # Save intermediate GeoJSON for reference
-        with open("00-data/empty-lands.geojson", "w") as f:
-            json.dump(empty_lands_geojson, f)
+        index_dir = f"{output_stem}.index"
+        build_index_from_frame(scored_lands_gdf, index_dir)
+        print(f"Saved query index to {index_dir}")
     except Exception as e:
-        print(f"Error converting OSM data to GeoJSON: {e}")
-        return
+        print(f"Error building query index: {e}")
+
+def validate_empty_lands(empty_lands_gdf, data_dir="./00-data", report_path=None):
+    """
+    Repair invalid OSM polygons (e.g. self-intersecting ways) before plots are saved or scored.
+    
+    Plots without a CRS are taken to be in EPSG:4326.
+    
+    Args:
+        empty_lands_gdf (GeoDataFrame): Plots, with their OSM way id in osmWayId
+        data_dir (str): Directory holding the shared geometry validation cache
+        report_path (str): Where to write the repair report, if anywhere
+    
+    Returns:
+        GeoDataFrame: Plots with repaired geometries
+    """
+    from geometry_validation import VALIDATION_CACHE_FILE, validate_frame
+
+    if empty_lands_gdf.crs is None:
+        empty_lands_gdf = empty_lands_gdf.set_crs("EPSG:4326")
+        print(f"Setting empty lands CRS to: {empty_lands_gdf.crs}")
+    else:
+        print(f"Empty lands CRS is: {empty_lands_gdf.crs}")
+    
+    return validate_frame(empty_lands_gdf, "empty lands", id_column="osmWayId",
+                          cache_path=os.path.join(data_dir, VALIDATION_CACHE_FILE), report_path=report_path)
+
+def prepare_sites(empty_lands_gdf, consolidate=True):
+    """
+    Project validated plots once and optionally merge them into development sites.
+    
+    Args:
+        empty_lands_gdf (GeoDataFrame): Validated plots, with their OSM way id in osmWayId
+        consolidate (bool): Merge touching or overlapping plots into sites
+    
+    Returns:
+        tuple: (sites_gdf, projected) where sites_gdf keeps osmWayId per plot,
+            or osmWayIds per site when consolidated, and projected holds its
+            geometries in PROJECTED_CRS
+    """
+    from geometry_metrics import PROJECTED_CRS, projected_geometry_array
+    from site_consolidation import consolidate_sites
+
+    # Keep only the way ids and geometry and drop all other properties
+    empty_lands_gdf = empty_lands_gdf[[column for column in ["osmWayId", "geometry"] if column in empty_lands_gdf]]
+    
+    # Project the plots once; consolidation and scoring share the array
+    projected = projected_geometry_array(empty_lands_gdf, PROJECTED_CRS)
+    if consolidate:
+        # Score each development site once, keeping the ways it was mapped as
+        empty_lands_gdf, projected = consolidate_sites(empty_lands_gdf, projected=projected, return_projected=True)
+    return empty_lands_gdf, projected
+
+def load_empty_lands(plots_file, data_dir="./00-data", consolidate=True):
+    """
+    Read saved plots and prepare them the way main does before scoring.
+    
+    Args:
+        plots_file (str): Plots GeoJSON, such as the empty-lands.geojson main writes
+        data_dir (str): Directory holding the shared geometry validation cache
+        consolidate (bool): Merge touching or overlapping plots into sites
+    
+    Returns:
+        tuple: (sites_gdf, projected) as returned by prepare_sites
+    """
+    import geopandas as gpd
+
+    empty_lands_gdf = gpd.read_file(plots_file)
+    return prepare_sites(validate_empty_lands(empty_lands_gdf, data_dir), consolidate)
+
+def main(pbf_file=None, backend="auto", approximate_resolution=None, stations_file=None, consolidate=True,
+         data_dir="./00-data", kernel="disk"):
+    """
+    Main function to run the script.
+    
+    Args:
+        pbf_file (str): Optional local .osm.pbf extract to read plots from
+            instead of the Overpass API
+        backend (str): Scoring backend, "process", "thread" or "auto"
+        approximate_resolution (float): Grid cell size in meters for approximate
+            scoring; None for exact scoring
+        stations_file (str): Railway stations file for station proximity metrics,
+            skipped if it does not exist; defaults to railway-stations.json in data_dir
+        consolidate (bool): Merge touching or overlapping plots into sites before scoring
+        data_dir (str): Directory holding the inputs, caches and outputs
+        kernel (str): Catchment shape for approximate scoring, "disk" or "square"
+    """
+    import geopandas as gpd
+    from score_rollups import print_rollup_summary, save_rollups, write_rollup_tables
+    from station_proximity import load_stations
+
+    start_time = time.time()
+    
+    geojson_dir = os.path.join(data_dir, "geojson")
+    raw_cache_file = os.path.join(data_dir, "empty-lands-raw.json")
+    empty_lands_file = os.path.join(data_dir, "empty-lands.geojson")
+    if stations_file is None:
+        stations_file = os.path.join(data_dir, "railway-stations.json")
+    
+    # Create output directory if it doesn't exist
+    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(geojson_dir, exist_ok=True)
+    
+    if pbf_file:
+        # Steps 1-2: Read empty lands straight from a local extract
+        try:
+            empty_lands_geojson = read_pbf_empty_lands(pbf_file)
+        except Exception as e:
+            print(f"Error reading OSM extract: {e}")
+            return
+    else:
+        # Step 1: Query Overpass API for empty lands
+        try:
+            # Check if we already have the data cached
+            if os.path.exists(raw_cache_file):
+                print("Loading empty lands from cache...")
+                with open(raw_cache_file, "r") as f:
+                    osm_data = json.load(f)
+            else:
+                # Query Overpass API
+                osm_data = query_overpass_api()
+                
+                # Save raw data for future use
+                with open(raw_cache_file, "w") as f:
+                    json.dump(osm_data, f)
+        except Exception as e:
+            print(f"Error querying Overpass API: {e}")
+            return
+        
+        # Step 2: Convert OSM data to GeoJSON
+        try:
+            empty_lands_geojson = convert_osm_to_geojson(osm_data)
+        except Exception as e:
+            print(f"Error converting OSM data to GeoJSON: {e}")
+            return
     
     # Step 3: Load datazones
     try:
-        datazones_file = "./00-data/geojson/datazones2011_data_normalized.geojson"
+        datazones_file = os.path.join(geojson_dir, "datazones2011_data_normalized.geojson")
         print(f"Loading datazones from {datazones_file}...")
         datazones_gdf = gpd.read_file(datazones_file)
     except Exception as e:
         print(f"Error loading datazones: {e}")
         return
     
-    # Step 4: Convert empty lands GeoJSON to GeoDataFrame
+    # Load railway stations, if available
+    stations_gdf = None
+    if stations_file and os.path.exists(stations_file):
+        try:
+            print(f"Loading railway stations from {stations_file}...")
+            stations_gdf = load_stations(stations_file)
+        except Exception as e:
+            print(f"Error loading railway stations: {e}")
+            return
+    else:
+        print(f"No railway stations file at {stations_file}, skipping station proximity")
+    
+    # Step 4: Convert empty lands GeoJSON to GeoDataFrame and repair it
     try:
         empty_lands_gdf = gpd.GeoDataFrame.from_features(empty_lands_geojson["features"])
+        empty_lands_gdf["osmWayId"] = [feature.get("id") for feature in empty_lands_geojson["features"]]
+        empty_lands_gdf = validate_empty_lands(
+            empty_lands_gdf, data_dir, report_path=os.path.join(data_dir, "empty-lands-validation-report.json"))
         
-        # Set CRS to match datazones (assuming WGS84)
-        if empty_lands_gdf.crs is None:
-            empty_lands_gdf.crs = "EPSG:4326"
-            print(f"Setting empty lands CRS to: {empty_lands_gdf.crs}")
-        else:
-            print(f"Empty lands CRS is: {empty_lands_gdf.crs}")
+        # Save the repaired plots for reference and for other stages to read
+        with open(empty_lands_file, "w") as f:
+            f.write(empty_lands_gdf.to_json(drop_id=True))
     except Exception as e:
         print(f"Error creating GeoDataFrame from empty lands: {e}")
         return
     
     # Step 5: Process empty lands and calculate scores
     try:
-        # Keep only the geometry column and drop all other properties
-        empty_lands_gdf = empty_lands_gdf[['geometry']]
+        empty_lands_gdf, projected = prepare_sites(empty_lands_gdf, consolidate)
         
-        scored_lands_gdf = process_empty_lands(empty_lands_gdf, datazones_gdf)
+        rollups = {}
+        if approximate_resolution:
+            scored_lands_gdf = process_empty_lands_approximate(empty_lands_gdf, datazones_gdf,
+                                                               resolution=approximate_resolution, kernel=kernel,
+                                                               stations_gdf=stations_gdf, rollups=rollups,
+                                                               projected=projected)
+        else:
+            scored_lands_gdf = process_empty_lands(empty_lands_gdf, datazones_gdf, backend=backend,
+                                                   stations_gdf=stations_gdf, rollups=rollups, projected=projected)
         print(f"Processed lands CRS: {scored_lands_gdf.crs}")
     except Exception as e:
         print(f"Error processing empty lands: {e}")
         return
     
-    # Step 6: Save the result to a GeoJSON file
+    # Step 6: Save the scored GeoJSON, metric means matrix and query index
     try:
-        output_file = "./00-data/geojson/scored-empty-lands.geojson"
-        
-        # Explicitly include CRS in the GeoJSON
-        geo_json_dict = json.loads(scored_lands_gdf.to_json())
-        
-        # Add CRS information to the GeoJSON
-        if scored_lands_gdf.crs:
-            crs_name = scored_lands_gdf.crs.to_string()
-            geo_json_dict["crs"] = {
-                "type": "name",
-                "properties": {
-                    "name": crs_name
-                }
-            }
-            print(f"Adding CRS to GeoJSON: {crs_name}")
-        
-        # Save to file
-        with open(output_file, "w") as f:
-            json.dump(geo_json_dict, f, indent=2)
-        
-        print(f"Successfully saved scored lands to {output_file}")
-        print(f"Total features: {len(scored_lands_gdf)}")
+        write_scored_lands(scored_lands_gdf, os.path.join(geojson_dir, "scored-empty-lands.geojson"))
     except Exception as e:
         print(f"Error saving scored lands: {e}")
         return
@@ -511,8 +830,43 @@ def main():
     except Exception as e:
         print(f"Error generating statistics: {e}")
     
+    # Step 8: Save per-council and per-DataZone rollups built while scoring
+    try:
+        rollup_prefix = os.path.join(geojson_dir, "scored-empty-lands-rollup")
+        for path in write_rollup_tables(rollups, rollup_prefix) + save_rollups(rollups, rollup_prefix):
+            print(f"Saved rollup to {path}")
+        print_rollup_summary(rollups)
+    except Exception as e:
+        print(f"Error saving rollups: {e}")
+    
     end_time = time.time()
     print(f"\nTotal processing time: {end_time - start_time:.2f} seconds")
 
+def run(argv=None):
+    """
+    Parse command line arguments and run the script.
+    
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Score empty lands against surrounding datazones.")
+    parser.add_argument("--data-dir", default="./00-data", help="Directory holding inputs, caches and outputs")
+    parser.add_argument("--pbf", help="Read plots from a local .osm.pbf extract instead of Overpass")
+    parser.add_argument("--pbf-threads", type=int, help="Threads decoding the extract (default: all cores)")
+    parser.add_argument("--backend", choices=["auto", "process", "thread"], default="auto",
+                        help="Parallel scoring backend (default: threads for small runs, processes for large)")
+    parser.add_argument("--approximate", type=float, nargs="?", const=GRID_RESOLUTION, metavar="RESOLUTION",
+                        help=f"Approximate grid-based scoring with this cell size in meters (default {GRID_RESOLUTION:g})")
+    parser.add_argument("--kernel", choices=["disk", "square"], default="disk",
+                        help="Catchment shape for approximate scoring: an FFT disk, or a faster summed-area square")
+    parser.add_argument("--stations", help="Railway stations as Overpass JSON or GeoJSON, for station proximity "
+                                           "metrics (default: railway-stations.json in the data directory)")
+    parser.add_argument("--no-consolidate", dest="consolidate", action="store_false",
+                        help="Score every OSM way separately instead of merging adjacent plots into sites")
+    args = parser.parse_args(argv)
+    if args.pbf:
+        set_pool_threads(args.pbf_threads)
+    main(args.pbf, args.backend, args.approximate, args.stations, args.consolidate, args.data_dir, args.kernel)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    run()
\ No newline at end of file
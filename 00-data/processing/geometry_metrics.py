@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import shapely
+
+# Projected CRS with meters as units (British National Grid)
+PROJECTED_CRS = "EPSG:27700"
+
+def projected_geometry_array(gdf, crs=PROJECTED_CRS):
+    """
+    Get a GeoDataFrame's geometries as a shapely array in a projected CRS.
+
+    The frame itself is left untouched, so callers can keep working in the
+    original CRS and reuse this array for every metric instead of calling
+    to_crs again.
+
+    Args:
+        gdf (GeoDataFrame): Input features
+        crs (str): Projected CRS to use
+
+    Returns:
+        ndarray: Shapely geometries in the projected CRS
+    """
+    if gdf.crs is None:
+        raise ValueError("Cannot project geometries without a CRS")
+    geometries = gdf.geometry.values
+    if gdf.crs != crs:
+        geometries = geometries.to_crs(crs)
+    return np.asarray(geometries)
+
+def centroid_coordinates(geometries):
+    """
+    Get the centroid coordinates of geometries without measuring anything else.
+
+    Args:
+        geometries (ndarray): Shapely geometries in any CRS
+
+    Returns:
+        tuple: (x, y) arrays of centroid coordinates in the geometries' CRS
+    """
+    centroids = shapely.centroid(geometries)
+    return shapely.get_x(centroids), shapely.get_y(centroids)
+
+def geometry_metrics(geometries):
+    """
+    Calculate area, perimeter, compactness, centroid and bounding box in one vectorized pass.
+
+    Compactness is the Polsby-Popper score 4*pi*area/perimeter^2, which is 1
+    for a circle and approaches 0 for long thin shapes.
+
+    Args:
+        geometries (ndarray): Shapely geometries in a projected CRS
+
+    Returns:
+        DataFrame: One row per geometry
+    """
+    area = shapely.area(geometries)
+    perimeter = shapely.length(geometries)
+    compactness = np.zeros(len(geometries), dtype=np.float64)
+    np.divide(4 * np.pi * area, perimeter ** 2, out=compactness, where=perimeter > 0)
+    centroid_x, centroid_y = centroid_coordinates(geometries)
+    bounds = shapely.bounds(geometries)
+
+    return pd.DataFrame({
+        "area": area,
+        "perimeter": perimeter,
+        "compactness": compactness.astype(np.float32),
+        "centroid_x": centroid_x,
+        "centroid_y": centroid_y,
+        "minx": bounds[:, 0],
+        "miny": bounds[:, 1],
+        "maxx": bounds[:, 2],
+        "maxy": bounds[:, 3]
+    })
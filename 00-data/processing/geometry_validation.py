@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import numpy as np
+import shapely
+
+# Validity cache shared by every stage that validates geometries, kept in the
+# data directory so data zones, council zones and plots use one set of entries
+VALIDATION_CACHE_FILE = "geometry-validation-cache.json"
+
+def geometry_hashes(geometries):
+    """
+    Hash geometries by their WKB representation.
+
+    Args:
+        geometries (ndarray): Shapely geometries
+
+    Returns:
+        list: Hex digests, one per geometry
+    """
+    return [hashlib.sha1(wkb).hexdigest() for wkb in shapely.to_wkb(geometries)]
+
+def _polygonal(geometry):
+    # make_valid can return collections with collapsed lines or points;
+    # keep only the polygonal parts so plots and zones stay polygons
+    if geometry is None or geometry.geom_type in ("Polygon", "MultiPolygon"):
+        return geometry
+    parts = [part for part in shapely.get_parts(geometry) if part.geom_type in ("Polygon", "MultiPolygon")]
+    if not parts:
+        return geometry
+    return shapely.union_all(parts)
+
+def load_validation_cache(path):
+    """
+    Load a geometry hash to validity flag cache.
+
+    Args:
+        path (str): Path to the JSON cache, may not exist yet
+
+    Returns:
+        dict: Mapping of geometry hash to True (valid) or False (repaired)
+    """
+    if path is None or not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save_validation_cache(path, cache):
+    """
+    Save a geometry validity cache.
+
+    Args:
+        path (str): Path to the JSON cache
+        cache (dict): Mapping of geometry hash to validity flag
+    """
+    with open(path, "w") as f:
+        json.dump(cache, f)
+
+def validate_geometries(geometries, cache=None):
+    """
+    Check geometries in bulk and repair only the invalid ones.
+
+    Geometries whose hash is cached as valid skip the validity check. Invalid
+    geometries are repaired with make_valid, which keeps every part of
+    self-intersecting (bow-tie) polygons instead of dropping some like buffer(0).
+
+    Args:
+        geometries (ndarray): Shapely geometries
+        cache (dict): Geometry hash to validity flag, updated in place
+
+    Returns:
+        tuple: (geometries, report) where geometries is a repaired copy and
+            report lists every repaired geometry
+    """
+    geometries = np.asarray(geometries, dtype=object).copy()
+    if cache is None:
+        cache = {}
+
+    hashes = geometry_hashes(geometries)
+    known_valid = np.array([cache.get(h) is True for h in hashes], dtype=bool)
+
+    # Only check what the cache cannot vouch for
+    to_check = np.flatnonzero(~known_valid)
+    valid = np.ones(len(geometries), dtype=bool)
+    valid[to_check] = shapely.is_valid(geometries[to_check])
+    invalid = np.flatnonzero(~valid & ~shapely.is_missing(geometries))
+
+    reasons = shapely.is_valid_reason(geometries[invalid])
+    original_area = shapely.area(geometries[invalid])
+    repaired = [_polygonal(g) for g in shapely.make_valid(geometries[invalid])]
+    geometries[invalid] = repaired
+
+    report = []
+    for i, reason, area_before, geometry in zip(invalid, reasons, original_area, repaired):
+        report.append({
+            "index": int(i),
+            "reason": reason,
+            "geometry_type": geometry.geom_type if geometry is not None else None,
+            "area_before": float(area_before),
+            "area_after": float(shapely.area(geometry))
+        })
+
+    for i in to_check:
+        cache[hashes[i]] = bool(valid[i])
+
+    return geometries, report
+
+def validate_frame(gdf, label="geometries", id_column=None, cache_path=None, report_path=None):
+    """
+    Validate and repair the geometries of a GeoDataFrame.
+
+    Args:
+        gdf (GeoDataFrame): Input features
+        label (str): Name used in printed messages and the report
+        id_column (str): Column whose value identifies repaired features in the report
+        cache_path (str): JSON validity cache to read and update
+        report_path (str): Where to write the repair report, if anywhere
+
+    Returns:
+        GeoDataFrame: Copy of the input with repaired geometries
+    """
+    cache = load_validation_cache(cache_path)
+    geometries, report = validate_geometries(gdf.geometry.values, cache)
+
+    if report:
+        print(f"Repaired {len(report)} of {len(gdf)} invalid {label}")
+    else:
+        print(f"All {len(gdf)} {label} are valid")
+
+    if id_column is not None and id_column in gdf.columns:
+        for entry in report:
+            entry[id_column] = str(gdf[id_column].iloc[entry["index"]])
+
+    if cache_path is not None:
+        save_validation_cache(cache_path, cache)
+    if report_path is not None:
+        with open(report_path, "w") as f:
+            json.dump({"dataset": label, "checked": len(gdf), "repaired": report}, f, indent=2)
+
+    gdf = gdf.copy()
+    gdf[gdf.geometry.name] = geometries
+    return gdf
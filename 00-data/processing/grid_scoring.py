@@ -0,0 +1,302 @@
+import numpy as np
+
+# Default grid cell size in meters
+GRID_RESOLUTION = 50.0
+
+# Rows of grid cells rasterized per spatial index query
+RASTER_BAND_ROWS = 256
+
+# Largest grid window rasterized at once, halo included. A float32 layer of
+# this size is 16 MB and its float64 FFT buffers about 100 MB, whatever the
+# size of the area scored; larger areas are split into windows.
+MAX_WINDOW_CELLS = 2048 * 2048
+
+def zone_cell_counts(geometries, origin, resolution=GRID_RESOLUTION):
+    """
+    Count the grid cell centres inside each geometry.
+
+    Counting on the whole lattice rather than inside one window keeps a
+    datazone's cell weight the same in every window it reaches into.
+
+    Args:
+        geometries (ndarray): Shapely geometries in a projected CRS
+        origin (tuple): (x, y) corner of the grid lattice
+        resolution (float): Cell size in meters
+
+    Returns:
+        ndarray: Number of cell centres within each geometry
+    """
+    import shapely
+
+    counts = np.zeros(len(geometries), dtype=np.int64)
+    if len(geometries) == 0:
+        return counts
+    bounds = shapely.bounds(geometries)
+    # First and last cell whose centre lies inside each bounding box
+    ix0 = np.ceil((bounds[:, 0] - origin[0]) / resolution - 0.5).astype(np.int64)
+    ix1 = np.floor((bounds[:, 2] - origin[0]) / resolution - 0.5).astype(np.int64)
+    iy0 = np.ceil((bounds[:, 1] - origin[1]) / resolution - 0.5).astype(np.int64)
+    iy1 = np.floor((bounds[:, 3] - origin[1]) / resolution - 0.5).astype(np.int64)
+
+    for k in np.flatnonzero((ix1 >= ix0) & (iy1 >= iy0)):
+        xs = origin[0] + (np.arange(ix0[k], ix1[k] + 1) + 0.5) * resolution
+        for band_start in range(iy0[k], iy1[k] + 1, RASTER_BAND_ROWS):
+            ys = origin[1] + (np.arange(band_start, min(band_start + RASTER_BAND_ROWS, iy1[k] + 1)) + 0.5) * resolution
+            xx, yy = np.meshgrid(xs, ys)
+            counts[k] += int(shapely.contains_xy(geometries[k], xx.ravel(), yy.ravel()).sum())
+    return counts
+
+class DatazoneGrid:
+    """
+    Datazones rasterized onto one window of a regular projected grid.
+
+    Each cell holds the row of the datazone containing its centre and a
+    weight of 1 / (number of cells in that datazone), so a datazone that lies
+    fully inside a catchment counts once whatever its size, like in the exact
+    engine.
+    """
+
+    def __init__(self, table, origin, shape, resolution=GRID_RESOLUTION, cells_per_zone=None):
+        """
+        Args:
+            table (DatazoneTable): Datazones to rasterize
+            origin (tuple): (x, y) lower left corner of the window, in the table's CRS
+            shape (tuple): (rows, columns) of the window
+            resolution (float): Cell size in meters
+            cells_per_zone (ndarray): Cells per datazone on the whole grid,
+                see zone_cell_counts; counted inside this window if None
+        """
+        import shapely
+
+        self.table = table
+        self.resolution = resolution
+        self.x0, self.y0 = origin
+        self.ny, self.nx = shape
+
+        self.zones = np.full((self.ny, self.nx), -1, dtype=np.int32)
+        xs = self.x0 + (np.arange(self.nx) + 0.5) * resolution
+        for band_start in range(0, self.ny, RASTER_BAND_ROWS):
+            band_rows = np.arange(band_start, min(band_start + RASTER_BAND_ROWS, self.ny))
+            ys = self.y0 + (band_rows + 0.5) * resolution
+            xx, yy = np.meshgrid(xs, ys)
+            cell_idx, zone_idx = table.tree.query(shapely.points(xx.ravel(), yy.ravel()), predicate="within")
+            # Cells on a shared boundary go to the first datazone found
+            band = np.full(xx.size, -1, dtype=np.int32)
+            band[cell_idx[::-1]] = zone_idx[::-1]
+            self.zones[band_rows] = band.reshape(xx.shape)
+
+        if cells_per_zone is None:
+            cells_per_zone = np.bincount(self.zones[self.zones >= 0], minlength=len(table))
+        zone_weights = np.zeros(len(table), dtype=np.float32)
+        np.divide(1.0, cells_per_zone, out=zone_weights, where=cells_per_zone > 0, casting="unsafe")
+        self.weights = np.where(self.zones >= 0, zone_weights[self.zones], np.float32(0))
+
+    def layer(self, values):
+        """
+        Weighted value and weight grids for one per-datazone value.
+
+        Args:
+            values (ndarray): Value per datazone, NaN for missing
+
+        Returns:
+            tuple: (weighted_values, weights) float32 grids, zero where there is no value
+        """
+        cell_values = np.where(self.zones >= 0, values[np.maximum(self.zones, 0)], np.nan).astype(np.float32)
+        present = ~np.isnan(cell_values)
+        weights = np.where(present, self.weights, np.float32(0))
+        return np.where(present, cell_values * weights, np.float32(0)), weights
+
+class DiskSampler:
+    """Sums over a disk around given cells, via one FFT convolution per grid."""
+
+    def __init__(self, shape, radius_cells, iy, ix):
+        r = int(np.ceil(radius_cells))
+        dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+        kernel = (dx ** 2 + dy ** 2 <= radius_cells ** 2).astype(np.float64)
+        self.offset = r
+        self.fft_shape = (shape[0] + 2 * r, shape[1] + 2 * r)
+        self.kernel_fft = np.fft.rfft2(kernel, self.fft_shape)
+        self.iy, self.ix = iy, ix
+
+    def __call__(self, grid):
+        # Convolve in float64; float32 FFT round-off would swamp small weights
+        grid_fft = np.fft.rfft2(grid.astype(np.float64), self.fft_shape)
+        full = np.fft.irfft2(grid_fft * self.kernel_fft, self.fft_shape)
+        return full[self.iy + self.offset, self.ix + self.offset]
+
+class SquareSampler:
+    """Sums over a square around given cells, via a summed-area table per grid."""
+
+    def __init__(self, shape, radius_cells, iy, ix):
+        r = int(np.ceil(radius_cells))
+        self.y0 = np.clip(iy - r, 0, shape[0])
+        self.y1 = np.clip(iy + r + 1, 0, shape[0])
+        self.x0 = np.clip(ix - r, 0, shape[1])
+        self.x1 = np.clip(ix + r + 1, 0, shape[1])
+
+    def __call__(self, grid):
+        table = np.zeros((grid.shape[0] + 1, grid.shape[1] + 1), dtype=np.float64)
+        np.cumsum(np.cumsum(grid, axis=0, dtype=np.float64), axis=1, out=table[1:, 1:])
+        return (table[self.y1, self.x1] - table[self.y0, self.x1]
+                - table[self.y1, self.x0] + table[self.y0, self.x0])
+
+def grid_windows(iy, ix, shape, halo, max_window_cells=MAX_WINDOW_CELLS):
+    """
+    Split the grid into windows around the cells holding plots.
+
+    The grid is cut into square tiles, and each tile holding plots becomes a
+    window extended by halo cells on every side, so catchments near a tile
+    edge still see all their cells. Tiles without plots are never rasterized.
+
+    Args:
+        iy (ndarray): Grid row of each plot
+        ix (ndarray): Grid column of each plot
+        shape (tuple): (rows, columns) of the whole grid
+        halo (int): Cells added on each side of a tile
+        max_window_cells (int): Largest window size in cells, halo included
+
+    Returns:
+        list: (row_start, column_start, row_end, column_end, plots) per window,
+            with plots the indices of the plots in its tile
+    """
+    tile_cells = int(np.sqrt(max_window_cells)) - 2 * halo
+    if tile_cells < 1:
+        raise ValueError(f"A {halo}-cell catchment halo does not fit in a {max_window_cells}-cell window; "
+                         f"use a coarser grid resolution")
+
+    tiles = (iy // tile_cells) * (shape[1] // tile_cells + 1) + ix // tile_cells
+    order = np.argsort(tiles, kind="stable")
+    starts = np.flatnonzero(np.r_[True, tiles[order][1:] != tiles[order][:-1]])
+    windows = []
+    for plots in np.split(order, starts[1:]):
+        tile_y, tile_x = iy[plots[0]] // tile_cells, ix[plots[0]] // tile_cells
+        windows.append((max(0, tile_y * tile_cells - halo), max(0, tile_x * tile_cells - halo),
+                        min(shape[0], (tile_y + 1) * tile_cells + halo),
+                        min(shape[1], (tile_x + 1) * tile_cells + halo), plots))
+    return windows
+
+def approximate_catchments(centroids, table, buffer_radius, resolution=GRID_RESOLUTION, kernel="disk",
+                           max_window_cells=MAX_WINDOW_CELLS):
+    """
+    Approximate every plot's catchment aggregates from a rasterized grid.
+
+    Each metric grid is convolved (disk kernel, by FFT) or turned into a
+    summed-area table (square kernel) once, after which each plot's catchment
+    mean is a constant-time lookup. The grid is processed one window at a
+    time, with only one metric layer of a window held at once, so memory is
+    bounded by max_window_cells however large the area is.
+
+    Args:
+        centroids (ndarray): (n x 2) array of projected plot centroids
+        table (DatazoneTable): Datazones in the same CRS
+        buffer_radius (float): Catchment radius in meters
+        resolution (float): Grid cell size in meters
+        kernel (str): "disk" or "square"
+        max_window_cells (int): Largest grid window rasterized at once
+
+    Returns:
+        tuple: (norm_means, raw_means, counts, zone_codes, council_codes) as
+            expected by build_score_columns; counts are the number of whole
+            datazones the catchment covers, rounded up
+    """
+    import shapely
+
+    if kernel == "disk":
+        sampler_class = DiskSampler
+    elif kernel == "square":
+        sampler_class = SquareSampler
+    else:
+        raise ValueError(f"Unknown grid kernel: {kernel}")
+
+    n = len(centroids)
+    n_metrics = len(table.metrics)
+    norm_means = np.full((n, n_metrics), np.nan, dtype=np.float32)
+    raw_means = np.full((n, n_metrics), np.nan, dtype=np.float32)
+    counts = np.zeros(n, dtype=np.int32)
+    zone_codes = np.full(n, -1, dtype=np.int32)
+    council_codes = np.full(n, -1, dtype=np.int32)
+    if n == 0:
+        return norm_means, raw_means, counts, zone_codes, council_codes
+
+    margin = buffer_radius + resolution
+    origin = (centroids[:, 0].min() - margin, centroids[:, 1].min() - margin)
+    shape = (max(1, int(np.ceil((centroids[:, 1].max() + margin - origin[1]) / resolution))),
+             max(1, int(np.ceil((centroids[:, 0].max() + margin - origin[0]) / resolution))))
+    iy = np.clip(((centroids[:, 1] - origin[1]) / resolution).astype(np.int64), 0, shape[0] - 1)
+    ix = np.clip(((centroids[:, 0] - origin[0]) / resolution).astype(np.int64), 0, shape[1] - 1)
+    windows = grid_windows(iy, ix, shape, int(np.ceil(margin / resolution)), max_window_cells)
+
+    # Cell counts of every datazone reaching into a window, over the whole lattice
+    extents = np.array([window[:4] for window in windows], dtype=np.float64) * resolution
+    window_boxes = shapely.box(origin[0] + extents[:, 1], origin[1] + extents[:, 0],
+                               origin[0] + extents[:, 3], origin[1] + extents[:, 2])
+    _, reached = table.tree.query(window_boxes, predicate="intersects")
+    reached = np.unique(reached)
+    cells_per_zone = np.zeros(len(table), dtype=np.int64)
+    cells_per_zone[reached] = zone_cell_counts(table.geometries[reached], origin, resolution)
+
+    window_cells = sum((w[2] - w[0]) * (w[3] - w[1]) for w in windows)
+    print(f"Rasterizing {len(table)} datazones onto {len(windows)} grid window(s) of a "
+          f"{shape[0]} x {shape[1]} grid at {resolution:g} m ({window_cells} cells)")
+
+    for row_start, column_start, row_end, column_end, plots in windows:
+        grid = DatazoneGrid(table, (origin[0] + column_start * resolution, origin[1] + row_start * resolution),
+                            (row_end - row_start, column_end - column_start), resolution, cells_per_zone)
+        local_iy, local_ix = iy[plots] - row_start, ix[plots] - column_start
+        sampler = sampler_class(grid.zones.shape, buffer_radius / resolution, local_iy, local_ix)
+
+        for matrix, means in [(table.norm, norm_means), (table.raw, raw_means)]:
+            for j in range(n_metrics):
+                weighted_values, weights = grid.layer(matrix[:, j])
+                value_sums, weight_sums = sampler(weighted_values), sampler(weights)
+                # FFT round-off leaves tiny non-zero weights where there is no data
+                has_data = weight_sums > 1e-6
+                means[plots[has_data], j] = value_sums[has_data] / weight_sums[has_data]
+
+        coverage = sampler(grid.weights)
+        counts[plots] = np.ceil(np.round(coverage, 4)).astype(np.int32)
+
+    # Identifiers use the same definition as the exact engine, not the grid
+    zone_codes, council_codes = table.containing_codes(centroids, buffer_radius)
+
+    return norm_means, raw_means, counts, zone_codes, council_codes
+
+def compare_with_exact(approximate_scores, exact_scores, columns, code_columns=()):
+    """
+    Summarize the error of approximate scores against exact ones.
+
+    Args:
+        approximate_scores (DataFrame): Approximate score columns
+        exact_scores (DataFrame): Exact score columns for the same rows
+        columns (list): Score columns to compare
+        code_columns (list): Identifier columns, such as DataZone, whose
+            values should agree between the engines
+
+    Returns:
+        dict: Mean and max absolute error and rank correlation per score
+            column, and the share of rows that agree per code column
+    """
+    report = {}
+    for column in code_columns:
+        if column not in approximate_scores or column not in exact_scores:
+            continue
+        approx = approximate_scores[column].astype(str).to_numpy()
+        exact = exact_scores[column].astype(str).to_numpy()
+        report[column] = {"agreement": float(np.mean(approx == exact)) if len(exact) else float("nan")}
+    for column in columns:
+        approx = approximate_scores[column].to_numpy(dtype=np.float64)
+        exact = exact_scores[column].to_numpy(dtype=np.float64)
+        both = ~np.isnan(approx) & ~np.isnan(exact)
+        if not both.any():
+            continue
+        error = np.abs(approx[both] - exact[both])
+        # Spearman rank correlation
+        approx_rank = np.argsort(np.argsort(approx[both]))
+        exact_rank = np.argsort(np.argsort(exact[both]))
+        rank_corr = np.corrcoef(approx_rank, exact_rank)[0, 1] if both.sum() > 1 else float("nan")
+        report[column] = {
+            "mean_abs_error": float(error.mean()),
+            "max_abs_error": float(error.max()),
+            "rank_correlation": float(rank_corr)
+        }
+    return report
@@ -4,12 +4,17 @@ import os
 import glob
 import sys
 
-def main():
-    # File paths
-    geojson_file = "00-data\\geojson\\datazones2011_with_local_auth_removed.geojson"
-    csv_folder = "00-data\\csv"
-    output_file = "00-data\\geojson\\datazones2011_enriched.geojson"
+def main(geojson_file="./00-data/geojson/datazones2011_with_local_auth_removed.geojson",
+         csv_folder="./00-data/csv",
+         output_file="./00-data/geojson/datazones2011_enriched.geojson"):
+    """
+    Add one column per CSV file to the datazones, matched on 2011Zones or CouncilArea.
     
+    Args:
+        geojson_file (str): Datazones GeoJSON with 2011Zones and CouncilArea columns
+        csv_folder (str): Folder of two-column CSV files
+        output_file (str): Path of the enriched GeoJSON
+    """
     # Check if input files exist
     if not os.path.exists(geojson_file):
         sys.exit(f"Error: GeoJSON file not found - {geojson_file}")
@@ -0,0 +1,167 @@
+import os
+import re
+
+# Keys that any way matched by query_overpass_api must have; used to let
+# libosmium drop everything else before it reaches Python
+EMPTY_LAND_KEYS = [
+    "railway",
+    "landuse",
+    "disused",
+    "abandoned",
+    "abandoned:landuse",
+    "disused:landuse",
+    "brownfield",
+    "vacant",
+    "operator",
+    "owner"
+]
+
+EMPTY_LANDUSE = re.compile("brownfield|greenfield|vacant|construction|landfill")
+NETWORK_RAIL = re.compile("Network Rail|network rail")
+
+# Environment variable libosmium sizes its decoding thread pool from
+POOL_THREADS_VARIABLE = "OSMIUM_POOL_THREADS"
+
+def is_empty_land(tags):
+    """
+    Check whether a way's tags match the empty land filters of query_overpass_api.
+
+    Args:
+        tags (dict): OSM tags of the way
+
+    Returns:
+        bool: True if the way is an empty land candidate
+    """
+    landuse = tags.get("landuse")
+    return (
+        ("railway" in tags and tags.get("disused") == "yes")
+        or landuse == "railway"
+        or tags.get("disused") == "yes"
+        or tags.get("abandoned") == "yes"
+        or "abandoned:landuse" in tags
+        or "disused:landuse" in tags
+        or (landuse is not None and EMPTY_LANDUSE.search(landuse) is not None)
+        or tags.get("brownfield") == "yes"
+        or tags.get("vacant") == "yes"
+        or NETWORK_RAIL.search(tags.get("operator", "")) is not None
+        or NETWORK_RAIL.search(tags.get("owner", "")) is not None
+    )
+
+def _parse_bbox(osm_bounding_zone):
+    # Same "south,west,north,east" format as query_overpass_api
+    south, west, north, east = (float(v) for v in osm_bounding_zone.split(","))
+    return south, west, north, east
+
+def set_pool_threads(threads=None):
+    """
+    Size libosmium's decoding thread pool for this process.
+
+    libosmium reads the pool size from the environment once, when the pool
+    first starts, so call this from the entry point before the first
+    extract is read; later calls in the same process have no effect. A
+    value already set in the environment is kept.
+
+    Args:
+        threads (int): Decoding threads, defaults to all cores
+
+    Returns:
+        str: The pool size in effect
+    """
+    if POOL_THREADS_VARIABLE not in os.environ:
+        os.environ[POOL_THREADS_VARIABLE] = str(threads or os.cpu_count() or 1)
+    return os.environ[POOL_THREADS_VARIABLE]
+
+def iter_pbf_empty_lands(pbf_file, osm_bounding_zone=None, location_storage="flex_mem", batch_size=None):
+    """
+    Stream empty land plots from a local .osm.pbf extract in batches.
+
+    The extract is streamed once. libosmium decodes the PBF blocks on a pool
+    of worker threads, caches node locations and drops every way without one
+    of the EMPTY_LAND_KEYS before Python sees it, so only candidate ways are
+    checked against the full query_overpass_api filters. The pool is sized
+    by set_pool_threads, which has to run before the first read.
+
+    Args:
+        pbf_file (str): Path to the .osm.pbf extract, e.g. a Geofabrik Scotland file
+        osm_bounding_zone (str): Optional "south,west,north,east" bounding box;
+            ways are kept if any node falls inside it
+        location_storage (str): libosmium node location storage, use a disk
+            based one such as "dense_file_array,<path>" for nationwide extracts
+        batch_size (int): Features per batch, None for a single batch
+
+    Yields:
+        list: GeoJSON features in the format of convert_osm_to_geojson
+    """
+    try:
+        import osmium
+        import osmium.filter
+    except ImportError:
+        raise ImportError("Reading .osm.pbf extracts needs pyosmium: pip install osmium")
+
+    bbox = _parse_bbox(osm_bounding_zone) if osm_bounding_zone else None
+
+    processor = (osmium.FileProcessor(pbf_file, osmium.osm.NODE | osmium.osm.WAY)
+                 .with_locations(location_storage)
+                 .with_filter(osmium.filter.EntityFilter(osmium.osm.WAY))
+                 .with_filter(osmium.filter.KeyFilter(*EMPTY_LAND_KEYS)))
+
+    features = []
+    for way in processor:
+        tags = dict(way.tags)
+        if not is_empty_land(tags):
+            continue
+
+        coords = [(node.lon, node.lat) for node in way.nodes if node.location.valid()]
+
+        # Skip ways with insufficient nodes
+        if len(coords) < 3:
+            continue
+
+        if bbox is not None:
+            south, west, north, east = bbox
+            if not any(west <= lon <= east and south <= lat <= north for lon, lat in coords):
+                continue
+
+        # Ensure the polygon is closed
+        if coords[0] != coords[-1]:
+            coords.append(coords[0])
+
+        features.append({
+            "type": "Feature",
+            "id": way.id,
+            "properties": tags,
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [coords]
+            }
+        })
+
+        if batch_size and len(features) >= batch_size:
+            yield features
+            features = []
+
+    if features or not batch_size:
+        yield features
+
+def read_pbf_empty_lands(pbf_file, osm_bounding_zone=None, location_storage="flex_mem"):
+    """
+    Read empty land plots from a local .osm.pbf extract.
+
+    Args:
+        pbf_file (str): Path to the .osm.pbf extract, e.g. a Geofabrik Scotland file
+        osm_bounding_zone (str): Optional "south,west,north,east" bounding box;
+            ways are kept if any node falls inside it
+        location_storage (str): libosmium node location storage, use a disk
+            based one such as "dense_file_array,<path>" for nationwide extracts
+
+    Returns:
+        dict: GeoJSON FeatureCollection in the format of convert_osm_to_geojson
+    """
+    print(f"Reading empty lands from {pbf_file}...")
+    features = next(iter_pbf_empty_lands(pbf_file, osm_bounding_zone, location_storage))
+
+    print(f"Found {len(features)} empty lands in {pbf_file}")
+    return {
+        "type": "FeatureCollection",
+        "features": features
+    }
@@ -0,0 +1,451 @@
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+import numpy as np
+
+# Default maximum number of plots per tile
+MAX_PLOTS_PER_TILE = 5000
+
+# Seconds after which a running tile without progress is considered abandoned
+STALE_AFTER = 3600
+
+MANIFEST = "manifest.json"
+
+def quadtree_tiles(x, y, max_plots=MAX_PLOTS_PER_TILE):
+    """
+    Split points into quadtree tiles with at most max_plots points each.
+
+    Args:
+        x (ndarray): Point x coordinates
+        y (ndarray): Point y coordinates
+        max_plots (int): Maximum number of points per tile
+
+    Returns:
+        list: (bbox, rows) per non-empty tile, where bbox is (minx, miny, maxx, maxy)
+    """
+    tiles = []
+    if len(x) == 0:
+        return tiles
+
+    stack = [((float(x.min()), float(y.min()), float(x.max()), float(y.max())), np.arange(len(x)))]
+    while stack:
+        bbox, rows = stack.pop()
+        minx, miny, maxx, maxy = bbox
+        # Stop at the size limit, or when all points coincide
+        if len(rows) <= max_plots or (maxx - minx <= 0 and maxy - miny <= 0):
+            tiles.append((bbox, rows))
+            continue
+
+        midx, midy = (minx + maxx) / 2, (miny + maxy) / 2
+        east = x[rows] > midx
+        north = y[rows] > midy
+        quadrants = [
+            ((minx, miny, midx, midy), ~east & ~north),
+            ((midx, miny, maxx, midy), east & ~north),
+            ((minx, midy, midx, maxy), ~east & north),
+            ((midx, midy, maxx, maxy), east & north)
+        ]
+        for quadrant_bbox, mask in reversed(quadrants):
+            if mask.any():
+                stack.append((quadrant_bbox, rows[mask]))
+
+    return tiles
+
+def _tile_path(run_dir, tile_id, kind):
+    return os.path.join(run_dir, "tiles", f"{tile_id}.{kind}.pkl")
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def _read_manifest(run_dir):
+    with open(os.path.join(run_dir, MANIFEST), "r") as f:
+        return json.load(f)
+
+def _update_manifest(run_dir, update, timeout=60):
+    """
+    Apply an update to the manifest while holding its lock file.
+
+    The lock is created with O_EXCL, which is atomic on local and network
+    filesystems, so workers on different hosts can share one run directory.
+    It holds a token, so a worker whose lock was broken as stale does not
+    remove the lock another worker took in the meantime.
+    """
+    lock_path = os.path.join(run_dir, f"{MANIFEST}.lock")
+    token = uuid.uuid4().hex
+    deadline = time.time() + timeout
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.write(fd, token.encode())
+            break
+        except FileExistsError:
+            # Break locks left behind by a crashed worker
+            try:
+                if time.time() - os.path.getmtime(lock_path) > timeout:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.time() > deadline:
+                raise TimeoutError(f"Could not lock manifest in {run_dir}")
+            time.sleep(0.05)
+
+    try:
+        manifest = _read_manifest(run_dir)
+        result = update(manifest)
+
+        def write(path):
+            with open(path, "w") as f:
+                json.dump(manifest, f, indent=2)
+        _write_atomic(os.path.join(run_dir, MANIFEST), write)
+        return result
+    finally:
+        os.close(fd)
+        _remove_own_lock(lock_path, token)
+
+def _remove_own_lock(lock_path, token):
+    try:
+        with open(lock_path, "r") as f:
+            if f.read() != token:
+                return
+        os.remove(lock_path)
+    except FileNotFoundError:
+        pass
+
+def prepare_run(run_dir, empty_lands_gdf, datazones_gdf, walking_radius_minutes=15,
+                max_plots_per_tile=MAX_PLOTS_PER_TILE, stations_gdf=None, projected=None):
+    """
+    Split a scoring run into spatial tiles and write the run directory.
+
+    Each tile gets its plot centroids and only the datazones within its
+    bounding box plus the walking-radius halo. An existing run directory is
+    kept, apart from failed tiles going back to pending, so preparing again
+    resumes rather than restarts.
+
+    Args:
+        run_dir (str): Shared run directory
+        empty_lands_gdf (GeoDataFrame): GeoDataFrame of empty lands
+        datazones_gdf (GeoDataFrame): GeoDataFrame of datazones
+        walking_radius_minutes (int): Walking time in minutes
+        max_plots_per_tile (int): Maximum number of plots per tile
+        stations_gdf (GeoDataFrame): Optional railway stations to score proximity to
+        projected (ndarray): The plots' geometries already in PROJECTED_CRS,
+            projected here if None
+
+    Returns:
+        dict: The run manifest
+    """
+    import pandas as pd
+    from datazone_table import DatazoneTable
+    from station_proximity import StationIndex, station_features
+    from generate_scored_lands import calculate_buffer_radius
+    from geometry_metrics import PROJECTED_CRS, geometry_metrics, projected_geometry_array
+
+    if os.path.exists(os.path.join(run_dir, MANIFEST)):
+        # Give failed tiles another chance; done tiles are never redone
+        def reset_failed(manifest):
+            for tile in manifest["tiles"]:
+                if tile["status"] == "failed":
+                    tile.update(status="pending", worker=None, updated=None)
+            return manifest
+        print(f"Resuming existing run in {run_dir}")
+        return _update_manifest(run_dir, reset_failed)
+
+    os.makedirs(os.path.join(run_dir, "tiles"), exist_ok=True)
+    buffer_radius = calculate_buffer_radius(walking_radius_minutes)
+
+    if projected is None:
+        projected = projected_geometry_array(empty_lands_gdf, PROJECTED_CRS)
+    plot_metrics = geometry_metrics(projected)
+    centroids = plot_metrics[["centroid_x", "centroid_y"]].to_numpy()
+    datazone_table = DatazoneTable(datazones_gdf)
+    features = station_features(centroids, StationIndex(stations_gdf), buffer_radius) if stations_gdf is not None else None
+
+    # Plots and their geometry metrics are needed again by the merge step
+    pd.to_pickle((empty_lands_gdf, plot_metrics), os.path.join(run_dir, "plots.pkl"))
+
+    tiles = []
+    for i, (bbox, rows) in enumerate(quadtree_tiles(centroids[:, 0], centroids[:, 1], max_plots_per_tile)):
+        tile_id = f"tile-{i:05d}"
+        tile_table = datazone_table.halo_subset(centroids[rows], buffer_radius)
+        tile_features = features.iloc[rows] if features is not None else None
+        pd.to_pickle((rows, centroids[rows], tile_table, tile_features), _tile_path(run_dir, tile_id, "input"))
+        tiles.append({
+            "id": tile_id,
+            "bbox": list(bbox),
+            "plots": int(len(rows)),
+            "datazones": len(tile_table),
+            "status": "pending",
+            "worker": None,
+            "updated": None
+        })
+
+    manifest = {
+        "created": time.time(),
+        "crs": PROJECTED_CRS,
+        "walking_radius_minutes": walking_radius_minutes,
+        "buffer_radius": buffer_radius,
+        "plot_count": int(len(centroids)),
+        "tiles": tiles
+    }
+    with open(os.path.join(run_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Prepared {len(tiles)} tiles for {len(centroids)} plots in {run_dir}")
+    return manifest
+
+def claim_tile(run_dir, worker_id, stale_after=STALE_AFTER):
+    """
+    Claim the next tile to score.
+
+    Tiles left running by this same worker id are claimed first, then pending
+    tiles, then tiles whose worker has not reported for stale_after seconds.
+
+    Args:
+        run_dir (str): Shared run directory
+        worker_id (str): Identifier of the claiming worker
+        stale_after (float): Seconds after which a running tile can be taken over
+
+    Returns:
+        dict: The claimed tile, or None if nothing is left to claim
+    """
+    def claim(manifest):
+        now = time.time()
+        tiles = manifest["tiles"]
+        candidates = (
+            [t for t in tiles if t["status"] == "running" and t["worker"] == worker_id]
+            + [t for t in tiles if t["status"] == "pending"]
+            + [t for t in tiles if t["status"] == "running" and now - (t["updated"] or 0) > stale_after]
+        )
+        if not candidates:
+            return None
+        tile = candidates[0]
+        tile.update(status="running", worker=worker_id, updated=now)
+        return dict(tile)
+
+    return _update_manifest(run_dir, claim)
+
+def _set_tile_status(run_dir, tile_id, worker_id, status, **fields):
+    def update(manifest):
+        for tile in manifest["tiles"]:
+            if tile["id"] == tile_id:
+                # Keep done tiles done if a slow worker finishes a taken-over tile
+                if tile["status"] != "done":
+                    tile.update(status=status, worker=worker_id, updated=time.time(), **fields)
+                return
+    _update_manifest(run_dir, update)
+
+def score_tile(run_dir, tile_id, buffer_radius):
+    """
+    Score one tile and write its output.
+
+    Args:
+        run_dir (str): Shared run directory
+        tile_id (str): Tile to score
+        buffer_radius (float): Buffer radius in meters
+
+    Returns:
+        DataFrame: Score columns indexed by plot position in the full input
+    """
+    import pandas as pd
+    from generate_scored_lands import process_land_chunk
+
+    rows, centroids, datazone_table, features = pd.read_pickle(_tile_path(run_dir, tile_id, "input"))
+    scores_df = process_land_chunk((centroids, datazone_table, buffer_radius, rows, features))
+
+    _write_atomic(_tile_path(run_dir, tile_id, "output"), lambda path: scores_df.to_pickle(path))
+    return scores_df
+
+def run_worker(run_dir, worker_id=None, stale_after=STALE_AFTER):
+    """
+    Claim and score tiles until none are left.
+
+    A worker restarted with the same worker_id first takes back the tiles it
+    was running when it stopped. The default id includes the process id,
+    which changes on restart, so pass a stable worker_id to resume without
+    waiting stale_after seconds.
+
+    Args:
+        run_dir (str): Shared run directory
+        worker_id (str): Identifier of this worker, defaults to host and process id
+        stale_after (float): Seconds after which a running tile can be taken over
+
+    Returns:
+        int: Number of tiles scored by this worker
+    """
+    if worker_id is None:
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    buffer_radius = _read_manifest(run_dir)["buffer_radius"]
+
+    scored = 0
+    while True:
+        tile = claim_tile(run_dir, worker_id, stale_after)
+        if tile is None:
+            break
+
+        # A previous attempt may have written the output before crashing
+        if not os.path.exists(_tile_path(run_dir, tile["id"], "output")):
+            start_time = time.time()
+            try:
+                score_tile(run_dir, tile["id"], buffer_radius)
+            except Exception as e:
+                _set_tile_status(run_dir, tile["id"], worker_id, "failed", error=str(e))
+                print(f"[{worker_id}] Error scoring {tile['id']}: {e}")
+                continue
+            seconds = round(time.time() - start_time, 3)
+        else:
+            seconds = None
+
+        _set_tile_status(run_dir, tile["id"], worker_id, "done", seconds=seconds)
+        scored += 1
+        print(f"[{worker_id}] Scored {tile['id']} ({tile['plots']} plots)")
+
+    return scored
+
+def run_status(run_dir):
+    """
+    Count tiles by status.
+
+    Args:
+        run_dir (str): Shared run directory
+
+    Returns:
+        dict: Number of tiles per status
+    """
+    counts = {}
+    for tile in _read_manifest(run_dir)["tiles"]:
+        counts[tile["status"]] = counts.get(tile["status"], 0) + 1
+    return counts
+
+def merge_run(run_dir, rollups=None):
+    """
+    Merge per-tile outputs into the scored empty lands.
+
+    Write the result with generate_scored_lands.write_scored_lands to also get
+    the metric means matrix and query index the later stages read.
+
+    Args:
+        run_dir (str): Shared run directory
+        rollups (dict): Optional score rollups to update from each tile's output
+
+    Returns:
+        GeoDataFrame: Scored empty lands in their original CRS
+    """
+    import pandas as pd
+    from generate_scored_lands import attach_scores
+    from score_rollups import update_rollups
+
+    manifest = _read_manifest(run_dir)
+    unfinished = [tile["id"] for tile in manifest["tiles"] if tile["status"] != "done"]
+    if unfinished:
+        raise RuntimeError(f"{len(unfinished)} tiles are not done yet, e.g. {unfinished[0]}")
+
+    empty_lands_gdf, plot_metrics = pd.read_pickle(os.path.join(run_dir, "plots.pkl"))
+    results = []
+    for tile in manifest["tiles"]:
+        results.append(pd.read_pickle(_tile_path(run_dir, tile["id"], "output")))
+        if rollups is not None:
+            update_rollups(rollups, results[-1])
+    if not results:
+        return empty_lands_gdf
+    return attach_scores(empty_lands_gdf, plot_metrics, results)
+
+def run_local(run_dir, num_workers=None, stale_after=STALE_AFTER):
+    """
+    Start several worker processes on this machine against a run directory.
+
+    Workers are named host:local-<n>, so running this again after a crash
+    resumes the tiles each worker was holding straight away.
+
+    Args:
+        run_dir (str): Shared run directory
+        num_workers (int): Number of worker processes, defaults to cores minus one
+        stale_after (float): Seconds after which a running tile can be taken over
+    """
+    if num_workers is None:
+        num_workers = max(1, multiprocessing.cpu_count() - 1)
+
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=(run_dir, f"{socket.gethostname()}:local-{i}", stale_after))
+               for i in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Spatially partitioned scoring of empty lands across workers.")
+    parser.add_argument("--run-dir", default="./00-data/partitioned-run", help="Shared run directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    prepare_parser = subparsers.add_parser("prepare", help="Split plots into tiles")
+    prepare_parser.add_argument("--plots", default="./00-data/empty-lands.geojson",
+                                help="Plots written by the score command; repaired and consolidated like it does")
+    prepare_parser.add_argument("--data-dir", default="./00-data", help="Directory holding the validation cache")
+    prepare_parser.add_argument("--no-consolidate", dest="consolidate", action="store_false",
+                                help="Score every OSM way separately instead of merging adjacent plots into sites")
+    prepare_parser.add_argument("--datazones", default="./00-data/geojson/datazones2011_data_normalized.geojson")
+    prepare_parser.add_argument("--minutes", type=int, default=15, help="Walking time in minutes")
+    prepare_parser.add_argument("--max-plots", type=int, default=MAX_PLOTS_PER_TILE, help="Maximum plots per tile")
+    prepare_parser.add_argument("--stations", help="Railway stations file for station proximity metrics")
+
+    worker_parser = subparsers.add_parser("worker", help="Score tiles until none are left")
+    worker_parser.add_argument("--worker-id", help="Worker identifier (default: host:pid); pass a stable id "
+                                                   "so a restarted worker resumes its own running tiles")
+    worker_parser.add_argument("--stale-after", type=float, default=STALE_AFTER)
+
+    local_parser = subparsers.add_parser("local", help="Run several workers on this machine")
+    local_parser.add_argument("--workers", type=int, help="Number of worker processes")
+    local_parser.add_argument("--stale-after", type=float, default=STALE_AFTER)
+
+    subparsers.add_parser("status", help="Show tile status counts")
+
+    merge_parser = subparsers.add_parser("merge", help="Merge tile outputs into the scored GeoJSON")
+    merge_parser.add_argument("--output", default="./00-data/geojson/scored-empty-lands.geojson")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "prepare":
+        import geopandas as gpd
+        from generate_scored_lands import load_empty_lands
+        empty_lands_gdf, projected = load_empty_lands(args.plots, args.data_dir, args.consolidate)
+        datazones_gdf = gpd.read_file(args.datazones)
+        stations_gdf = None
+        if args.stations:
+            from station_proximity import load_stations
+            stations_gdf = load_stations(args.stations)
+        prepare_run(args.run_dir, empty_lands_gdf, datazones_gdf, args.minutes, args.max_plots, stations_gdf,
+                    projected)
+    elif args.command == "worker":
+        scored = run_worker(args.run_dir, args.worker_id, args.stale_after)
+        print(f"Worker finished after scoring {scored} tiles")
+    elif args.command == "local":
+        run_local(args.run_dir, args.workers, args.stale_after)
+        print(f"Tile status: {run_status(args.run_dir)}")
+    elif args.command == "status":
+        print(f"Tile status: {run_status(args.run_dir)}")
+    elif args.command == "merge":
+        from generate_scored_lands import write_scored_lands
+        from score_rollups import print_rollup_summary, save_rollups, write_rollup_tables
+        rollups = {}
+        scored_lands_gdf = merge_run(args.run_dir, rollups)
+        write_scored_lands(scored_lands_gdf, args.output)
+        rollup_prefix = f"{os.path.splitext(args.output)[0]}-rollup"
+        for path in write_rollup_tables(rollups, rollup_prefix) + save_rollups(rollups, rollup_prefix):
+            print(f"Saved rollup to {path}")
+        print_rollup_summary(rollups)
+
+if __name__ == "__main__":
+    main()
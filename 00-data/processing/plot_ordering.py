@@ -0,0 +1,96 @@
+import numpy as np
+
+# Bits per axis of the curve grid (2^16 x 2^16 cells)
+CURVE_BITS = 16
+
+def _grid_coordinates(x, y, bits):
+    # Scale coordinates onto a square integer grid covering their bounding box
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    side = (1 << bits) - 1
+    minx, miny = x.min(), y.min()
+    extent = max(x.max() - minx, y.max() - miny) or 1.0
+    xi = np.round((x - minx) / extent * side).astype(np.uint64)
+    yi = np.round((y - miny) / extent * side).astype(np.uint64)
+    return xi, yi
+
+def hilbert_keys(x, y, bits=CURVE_BITS):
+    """
+    Calculate Hilbert curve keys for points.
+
+    Args:
+        x (ndarray): Point x coordinates
+        y (ndarray): Point y coordinates
+        bits (int): Bits per axis of the curve grid
+
+    Returns:
+        ndarray: uint64 key per point; nearby keys are nearby in space
+    """
+    if len(x) == 0:
+        return np.empty(0, dtype=np.uint64)
+
+    xi, yi = _grid_coordinates(x, y, bits)
+    n = np.uint64(1 << bits)
+    keys = np.zeros(len(xi), dtype=np.uint64)
+    s = np.uint64(1 << (bits - 1))
+    while s > 0:
+        rx = (xi & s) > 0
+        ry = (yi & s) > 0
+        keys += s * s * ((3 * rx.astype(np.uint64)) ^ ry.astype(np.uint64))
+
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        xi[flip] = n - 1 - xi[flip]
+        yi[flip] = n - 1 - yi[flip]
+        swap = ~ry
+        xi[swap], yi[swap] = yi[swap], xi[swap].copy()
+        s >>= np.uint64(1)
+    return keys
+
+def _spread_bits(v):
+    # Insert a zero bit between each of the lower 32 bits
+    v = v & np.uint64(0x00000000FFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+def z_order_keys(x, y, bits=CURVE_BITS):
+    """
+    Calculate Z-order (Morton) keys for points.
+
+    Args:
+        x (ndarray): Point x coordinates
+        y (ndarray): Point y coordinates
+        bits (int): Bits per axis of the curve grid
+
+    Returns:
+        ndarray: uint64 key per point
+    """
+    if len(x) == 0:
+        return np.empty(0, dtype=np.uint64)
+
+    xi, yi = _grid_coordinates(x, y, bits)
+    return _spread_bits(xi) | (_spread_bits(yi) << np.uint64(1))
+
+def spatial_order(x, y, curve="hilbert"):
+    """
+    Order points along a space-filling curve.
+
+    Args:
+        x (ndarray): Point x coordinates
+        y (ndarray): Point y coordinates
+        curve (str): "hilbert" or "zorder"
+
+    Returns:
+        ndarray: Permutation that sorts the points along the curve
+    """
+    if curve == "hilbert":
+        keys = hilbert_keys(x, y)
+    elif curve == "zorder":
+        keys = z_order_keys(x, y)
+    else:
+        raise ValueError(f"Unknown space-filling curve: {curve}")
+    return np.argsort(keys, kind="stable")
@@ -0,0 +1,414 @@
+import argparse
+import csv
+import heapq
+import json
+import os
+import numpy as np
+from scoring_model import CATEGORIES
+
+# Columns with a precomputed descending sort order
+SORTED_COLUMNS = ["overallScore"] + [category["heading"] for category in CATEGORIES] + ["area"]
+
+# Target number of plots per spatial grid cell
+PLOTS_PER_CELL = 32
+
+# Mean Earth radius in meters, for haversine distances
+EARTH_RADIUS = 6371008.8
+
+def haversine_distance(lon, lat, point_lon, point_lat):
+    """
+    Calculate great-circle distances from many points to one point.
+
+    Args:
+        lon (ndarray): Longitudes in degrees
+        lat (ndarray): Latitudes in degrees
+        point_lon (float): Longitude of the reference point
+        point_lat (float): Latitude of the reference point
+
+    Returns:
+        ndarray: Distances in meters
+    """
+    lon, lat = np.radians(lon), np.radians(lat)
+    point_lon, point_lat = np.radians(point_lon), np.radians(point_lat)
+    a = (np.sin((lat - point_lat) / 2) ** 2
+         + np.cos(lat) * np.cos(point_lat) * np.sin((lon - point_lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+def build_index_from_frame(scored_lands_gdf, index_dir):
+    """
+    Build a query index for scored lands.
+
+    The index is a directory of .npy columns that are memory-mapped at query
+    time, so queries never load the full scored GeoJSON. It holds centroid
+    coordinates, a uniform grid over the centroids stored as sorted row lists
+    with cell offsets, a descending sort order for every score column and the
+    plot geometries as WKB.
+
+    Args:
+        scored_lands_gdf (GeoDataFrame): Scored empty lands in EPSG:4326
+        index_dir (str): Directory to write the index to
+    """
+    import shapely
+    from geometry_metrics import centroid_coordinates
+
+    os.makedirs(index_dir, exist_ok=True)
+    n = len(scored_lands_gdf)
+    geometries = scored_lands_gdf.geometry.values
+    lon, lat = centroid_coordinates(np.asarray(geometries))
+
+    def save(name, values):
+        np.save(os.path.join(index_dir, f"{name}.npy"), values)
+
+    save("lon", lon.astype(np.float64))
+    save("lat", lat.astype(np.float64))
+    save("ids", scored_lands_gdf["id"].to_numpy(dtype=np.int64))
+
+    # Numeric columns, with NaN for missing values
+    for column in SORTED_COLUMNS:
+        if column in scored_lands_gdf.columns:
+            values = scored_lands_gdf[column].to_numpy(dtype=np.float32, na_value=np.nan)
+        else:
+            values = np.full(n, np.nan, dtype=np.float32)
+        save(column, values)
+        # Descending order with NaN last
+        save(f"order_{column}", np.argsort(np.where(np.isnan(values), -np.inf, -values), kind="stable").astype(np.int64))
+
+    # Categorical codes for text columns
+    categories = {}
+    for column in ["CouncilArea", "DataZone"]:
+        if column in scored_lands_gdf.columns:
+            codes, uniques = scored_lands_gdf[column].factorize()
+            categories[column] = [str(value) for value in uniques]
+            save(f"codes_{column}", codes.astype(np.int32))
+
+    # Uniform grid over centroids, stored as rows sorted by cell with offsets
+    if n > 0:
+        x0, y0, x1, y1 = float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())
+    else:
+        x0, y0, x1, y1 = 0.0, 0.0, 0.0, 0.0
+    cells_wanted = max(1, n // PLOTS_PER_CELL)
+    width, height = max(x1 - x0, 1e-9), max(y1 - y0, 1e-9)
+    cell_size = max(np.sqrt(width * height / cells_wanted), 1e-6)
+    nx = int(np.ceil(width / cell_size)) or 1
+    ny = int(np.ceil(height / cell_size)) or 1
+    cell_x = np.clip(((lon - x0) / cell_size).astype(np.int64), 0, nx - 1)
+    cell_y = np.clip(((lat - y0) / cell_size).astype(np.int64), 0, ny - 1)
+    cell = cell_y * nx + cell_x
+    cell_rows = np.argsort(cell, kind="stable").astype(np.int64)
+    cell_start = np.zeros(nx * ny + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cell, minlength=nx * ny), out=cell_start[1:])
+    save("cell_rows", cell_rows)
+    save("cell_start", cell_start)
+
+    # Geometries as concatenated WKB with offsets
+    wkb = shapely.to_wkb(np.asarray(geometries))
+    lengths = np.fromiter((len(w) for w in wkb), dtype=np.int64, count=n)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    save("geometry_offsets", offsets)
+    with open(os.path.join(index_dir, "geometry.bin"), "wb") as f:
+        for w in wkb:
+            f.write(w)
+
+    meta = {
+        "count": n,
+        "columns": SORTED_COLUMNS,
+        "categories": categories,
+        "grid": {"x0": x0, "y0": y0, "cell_size": cell_size, "nx": nx, "ny": ny}
+    }
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+def build_index(scored_file, index_dir):
+    """
+    Build a query index from a scored lands GeoJSON file.
+
+    Args:
+        scored_file (str): Path to the scored lands GeoJSON
+        index_dir (str): Directory to write the index to
+    """
+    import geopandas as gpd
+
+    scored_lands_gdf = gpd.read_file(scored_file)
+    if scored_lands_gdf.crs is not None and scored_lands_gdf.crs != "EPSG:4326":
+        scored_lands_gdf = scored_lands_gdf.to_crs("EPSG:4326")
+    build_index_from_frame(scored_lands_gdf, index_dir)
+
+class ScoredLandsIndex:
+    """Memory-mapped top-K and filter queries over scored lands."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self.count = self.meta["count"]
+        self.grid = self.meta["grid"]
+        self._arrays = {}
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.index_dir, f"{name}.npy"), mmap_mode="r")
+        return self._arrays[name]
+
+    def candidates(self, bbox):
+        """
+        Find rows whose centroid lies in a bounding box using the grid index.
+
+        Args:
+            bbox (tuple): (west, south, east, north) in degrees
+
+        Returns:
+            ndarray: Sorted candidate row numbers
+        """
+        west, south, east, north = bbox
+        grid = self.grid
+        nx, ny, size = grid["nx"], grid["ny"], grid["cell_size"]
+        cx0 = max(0, int(np.floor((west - grid["x0"]) / size)))
+        cx1 = min(nx - 1, int(np.floor((east - grid["x0"]) / size)))
+        cy0 = max(0, int(np.floor((south - grid["y0"]) / size)))
+        cy1 = min(ny - 1, int(np.floor((north - grid["y0"]) / size)))
+        if cx0 > cx1 or cy0 > cy1:
+            return np.empty(0, dtype=np.int64)
+
+        cell_start, cell_rows = self._array("cell_start"), self._array("cell_rows")
+        # Rows of each grid row of cells are contiguous in cell_rows
+        parts = [cell_rows[cell_start[cy * nx + cx0]:cell_start[cy * nx + cx1 + 1]] for cy in range(cy0, cy1 + 1)]
+        rows = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+        lon, lat = self._array("lon")[rows], self._array("lat")[rows]
+        inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+        return rows[inside]
+
+    def _filter_mask(self, rows, council=None, min_area=None, polygon=None, near=None, max_distance=None):
+        mask = np.ones(len(rows), dtype=bool)
+        if council is not None:
+            councils = self.meta["categories"]["CouncilArea"]
+            code = councils.index(council) if council in councils else -2
+            mask &= self._array("codes_CouncilArea")[rows] == code
+        if min_area is not None:
+            mask &= self._array("area")[rows] >= min_area
+        if polygon is not None:
+            import shapely
+            mask &= shapely.contains_xy(polygon, self._array("lon")[rows], self._array("lat")[rows])
+        if near is not None and max_distance is not None:
+            distance = haversine_distance(self._array("lon")[rows], self._array("lat")[rows], near[0], near[1])
+            mask &= distance <= max_distance
+        return mask
+
+    def _spatial_bbox(self, bbox=None, polygon=None, near=None, max_distance=None):
+        boxes = []
+        if bbox is not None:
+            boxes.append(tuple(bbox))
+        if polygon is not None:
+            boxes.append(tuple(polygon.bounds))
+        if near is not None and max_distance is not None:
+            dlat = np.degrees(max_distance / EARTH_RADIUS)
+            dlon = dlat / max(np.cos(np.radians(near[1])), 1e-6)
+            boxes.append((near[0] - dlon, near[1] - dlat, near[0] + dlon, near[1] + dlat))
+        if not boxes:
+            return None
+        return (max(b[0] for b in boxes), max(b[1] for b in boxes),
+                min(b[2] for b in boxes), min(b[3] for b in boxes))
+
+    def top_k(self, k=10, by="overallScore", council=None, bbox=None, polygon=None,
+              min_area=None, near=None, max_distance=None):
+        """
+        Select the K highest-scoring plots matching all filters.
+
+        Spatially restricted queries take candidates from the grid index and
+        select with a heap. Unrestricted queries walk the precomputed sort
+        order in blocks and stop as soon as K matches are found.
+
+        Args:
+            k (int): Number of plots to return
+            by (str): Score column to rank by
+            council (str): Only plots in this council area
+            bbox (tuple): Only plots with a centroid in (west, south, east, north)
+            polygon (Polygon): Only plots with a centroid inside this polygon
+            min_area (float): Only plots with at least this area in square meters
+            near (tuple): (lon, lat) reference point for the distance filter
+            max_distance (float): Only plots within this distance of near, in meters
+
+        Returns:
+            ndarray: Row numbers of the selected plots, best first
+        """
+        if by not in self.meta["columns"]:
+            raise ValueError(f"Cannot rank by '{by}', indexed columns are: {', '.join(self.meta['columns'])}")
+        if council is not None and "CouncilArea" not in self.meta["categories"]:
+            raise ValueError("Cannot filter by council, the scored lands had no CouncilArea column")
+        if k <= 0 or self.count == 0:
+            return np.empty(0, dtype=np.int64)
+
+        filters = dict(council=council, min_area=min_area, polygon=polygon, near=near, max_distance=max_distance)
+        values = self._array(by)
+        spatial_bbox = self._spatial_bbox(bbox, polygon, near, max_distance)
+
+        if spatial_bbox is not None:
+            rows = self.candidates(spatial_bbox)
+            rows = rows[self._filter_mask(rows, **filters)]
+            scores = values[rows]
+            keep = ~np.isnan(scores)
+            best = heapq.nlargest(k, zip(scores[keep].tolist(), (-rows[keep]).tolist()))
+            return np.array([-row for _, row in best], dtype=np.int64)
+
+        order = self._array(f"order_{by}")
+        selected = []
+        block = max(4 * k, 1024)
+        for start in range(0, self.count, block):
+            rows = np.asarray(order[start:start + block])
+            rows = rows[~np.isnan(values[rows])]
+            if len(rows) == 0:
+                break
+            selected.extend(rows[self._filter_mask(rows, **filters)][:k - len(selected)].tolist())
+            if len(selected) >= k:
+                break
+        return np.array(selected, dtype=np.int64)
+
+    def records(self, rows, near=None, with_geometry=False):
+        """
+        Read the indexed attributes of selected rows.
+
+        Args:
+            rows (ndarray): Row numbers
+            near (tuple): (lon, lat) to report distances from
+            with_geometry (bool): Include the plot geometry
+
+        Returns:
+            list: One dict per row
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        lon, lat = self._array("lon")[rows], self._array("lat")[rows]
+        columns = {column: self._array(column)[rows] for column in self.meta["columns"]}
+        text = {column: (self._array(f"codes_{column}")[rows], names)
+                for column, names in self.meta["categories"].items()}
+        distances = haversine_distance(lon, lat, near[0], near[1]) if near is not None else None
+
+        geometries = None
+        if with_geometry:
+            import shapely
+            offsets = self._array("geometry_offsets")
+            blob = np.memmap(os.path.join(self.index_dir, "geometry.bin"), dtype=np.uint8, mode="r")
+            geometries = [shapely.from_wkb(blob[offsets[row]:offsets[row + 1]].tobytes()) for row in rows]
+
+        records = []
+        for i, row in enumerate(rows):
+            record = {"id": int(self._array("ids")[row]), "lon": float(lon[i]), "lat": float(lat[i])}
+            for column, values in columns.items():
+                if not np.isnan(values[i]):
+                    record[column] = float(values[i])
+            for column, (codes, names) in text.items():
+                if codes[i] >= 0:
+                    record[column] = names[codes[i]]
+            if distances is not None:
+                record["distance"] = float(distances[i])
+            if geometries is not None:
+                record["geometry"] = geometries[i]
+            records.append(record)
+        return records
+
+def write_records(output_file, records):
+    """
+    Write query results as CSV, or as GeoJSON when geometries are included.
+
+    Args:
+        output_file (str): Path to the output file
+        records (list): Records from ScoredLandsIndex.records
+    """
+    if output_file.endswith(".geojson"):
+        import shapely
+        features = []
+        for record in records:
+            properties = {key: value for key, value in record.items() if key != "geometry"}
+            geometry = record.get("geometry")
+            features.append({
+                "type": "Feature",
+                "id": record["id"],
+                "properties": properties,
+                "geometry": json.loads(shapely.to_geojson(geometry)) if geometry is not None else None
+            })
+        with open(output_file, "w") as f:
+            json.dump({"type": "FeatureCollection", "features": features}, f)
+        return
+
+    fields = []
+    for record in records:
+        fields.extend(key for key in record if key not in fields and key != "geometry")
+    with open(output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({key: value for key, value in record.items() if key != "geometry"})
+
+def _float_list(text, count):
+    values = [float(value) for value in text.split(",")]
+    if len(values) != count:
+        raise argparse.ArgumentTypeError(f"Expected {count} comma-separated numbers, got '{text}'")
+    return values
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Indexed top-K and filter queries over scored empty lands.")
+    parser.add_argument("--index", default="./00-data/geojson/scored-empty-lands.index",
+                        help="Index directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build the index from the scored GeoJSON")
+    build_parser.add_argument("--scored", default="./00-data/geojson/scored-empty-lands.geojson")
+
+    top_parser = subparsers.add_parser("top", help="Select the top-K plots")
+    top_parser.add_argument("-k", type=int, default=10, help="Number of plots to return")
+    top_parser.add_argument("--by", default="overallScore", help="Score column to rank by")
+    top_parser.add_argument("--council", help="Council area name")
+    top_parser.add_argument("--bbox", type=lambda text: _float_list(text, 4), help="west,south,east,north")
+    top_parser.add_argument("--polygon", help="GeoJSON file with a polygon to restrict to")
+    top_parser.add_argument("--min-area", type=float, help="Minimum plot area in square meters")
+    top_parser.add_argument("--near", type=lambda text: _float_list(text, 2), help="lon,lat")
+    top_parser.add_argument("--within", type=float, help="Maximum distance from --near in meters")
+    top_parser.add_argument("--output", help="Write results to a .csv or .geojson file")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        print(f"Building index for {args.scored}...")
+        build_index(args.scored, args.index)
+        print(f"Saved index to {args.index}")
+        return
+
+    polygon = None
+    if args.polygon:
+        import shapely
+        with open(args.polygon, "r") as f:
+            data = json.load(f)
+        if data.get("type") == "FeatureCollection":
+            data = data["features"][0]["geometry"]
+        elif data.get("type") == "Feature":
+            data = data["geometry"]
+        polygon = shapely.from_geojson(json.dumps(data))
+        shapely.prepare(polygon)
+    if args.within is not None and args.near is None:
+        parser.error("--within requires --near")
+
+    index = ScoredLandsIndex(args.index)
+    try:
+        rows = index.top_k(args.k, by=args.by, council=args.council, bbox=args.bbox, polygon=polygon,
+                           min_area=args.min_area, near=args.near, max_distance=args.within)
+    except ValueError as e:
+        parser.error(str(e))
+    with_geometry = bool(args.output and args.output.endswith(".geojson"))
+    records = index.records(rows, near=args.near, with_geometry=with_geometry)
+
+    if args.output:
+        write_records(args.output, records)
+        print(f"Saved {len(records)} plots to {args.output}")
+    else:
+        for rank, record in enumerate(records, start=1):
+            score = record.get(args.by, float("nan"))
+            council = record.get("CouncilArea", "")
+            print(f"{rank:>3}. id={record['id']:<8} {args.by}={score:.4f} area={record.get('area', 0):.0f} {council}")
+
+if __name__ == "__main__":
+    main()
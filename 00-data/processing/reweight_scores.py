@@ -0,0 +1,94 @@
+import argparse
+import json
+import time
+import numpy as np
+from scoring_model import load_weights_config, load_metric_means, score_matrix
+
+def reweight_scores(means_file, weights_file=None):
+    """
+    Re-score every plot under a weights/polarity config.
+
+    Args:
+        means_file (str): Path to the metric means matrix written by the scoring stage
+        weights_file (str): Path to a JSON weights config, defaults to equal weights
+
+    Returns:
+        tuple: (ids, scores) where scores maps score names to arrays
+    """
+    ids, norm_means, metrics = load_metric_means(means_file)
+    config = load_weights_config(weights_file) if weights_file else None
+    return ids, score_matrix(norm_means, metrics, config)
+
+def write_scores_csv(output_file, ids, scores):
+    """
+    Write re-weighted scores as a CSV with one row per plot.
+
+    Args:
+        output_file (str): Path to the CSV file
+        ids (ndarray): Plot ids
+        scores (dict): Score arrays keyed by score name
+    """
+    names = list(scores)
+    table = np.column_stack([ids.astype(np.float64)] + [scores[name].astype(np.float64) for name in names])
+    np.savetxt(output_file, table, delimiter=",", header=",".join(["id"] + names),
+               comments="", fmt=["%d"] + ["%.6f"] * len(names))
+
+def apply_scores_to_geojson(scored_file, output_file, ids, scores):
+    """
+    Replace the score properties in a scored lands GeoJSON.
+
+    Args:
+        scored_file (str): Path to the scored lands GeoJSON
+        output_file (str): Path to write the updated GeoJSON
+        ids (ndarray): Plot ids
+        scores (dict): Score arrays keyed by score name
+    """
+    with open(scored_file, "r") as f:
+        geojson = json.load(f)
+
+    row_for_id = {int(plot_id): row for row, plot_id in enumerate(ids)}
+
+    for feature in geojson["features"]:
+        properties = feature["properties"]
+        row = row_for_id.get(int(properties["id"]))
+        if row is None:
+            continue
+        for name, values in scores.items():
+            value = float(values[row])
+            if np.isnan(value):
+                properties.pop(name, None)
+            else:
+                properties[name] = value
+
+    with open(output_file, "w") as f:
+        json.dump(geojson, f)
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Re-weight scored empty lands without rerunning the geometry stage.")
+    parser.add_argument("--weights", help="JSON weights/polarity config (default: equal weights)")
+    parser.add_argument("--means", default="./00-data/geojson/scored-empty-lands-metrics.npz",
+                        help="Metric means matrix written by generate_scored_lands.py")
+    parser.add_argument("--output", default="./00-data/geojson/scored-empty-lands-reweighted.csv",
+                        help="Output file, .csv or .geojson")
+    parser.add_argument("--scored", default="./00-data/geojson/scored-empty-lands.geojson",
+                        help="Scored lands GeoJSON to update when writing .geojson output")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    ids, scores = reweight_scores(args.means, args.weights)
+    print(f"Re-weighted {len(ids)} plots in {(time.time() - start_time) * 1000:.1f} ms")
+
+    if args.output.endswith(".geojson"):
+        apply_scores_to_geojson(args.scored, args.output, ids, scores)
+    else:
+        write_scores_csv(args.output, ids, scores)
+    print(f"Saved re-weighted scores to {args.output}")
+
+if __name__ == "__main__":
+    main()
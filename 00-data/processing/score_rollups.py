@@ -0,0 +1,411 @@
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+from scoring_model import CATEGORIES
+
+# Grouping columns of the rollup tables, as written by the scoring stage
+ROLLUP_LEVELS = ["CouncilArea", "DataZone"]
+
+# Scores are weighted means of normalized values, so they lie in [0, 1]
+SCORE_RANGE = (0.0, 1.0)
+
+# Bins of the quantile sketch; quantiles are resolved to within one bin width
+SKETCH_BINS = 200
+
+# Bins of the published histograms; must divide SKETCH_BINS
+HISTOGRAM_BINS = 10
+
+# Quantiles reported in the rollup tables
+ROLLUP_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+def score_columns(columns):
+    """
+    List the score columns present, overall score first.
+
+    Args:
+        columns (iterable): Column names of a scored frame
+
+    Returns:
+        list: overallScore and the category score columns found
+    """
+    columns = set(columns)
+    candidates = ["overallScore"] + [category["heading"] for category in CATEGORIES]
+    return [column for column in candidates if column in columns]
+
+class ScoreRollup:
+    """
+    Per-group score statistics that can be built incrementally and merged.
+
+    Each group keeps, per score column, the plot count, sum, minimum, maximum
+    and a fixed-bin histogram over SCORE_RANGE. Adding plots and merging two
+    rollups are plain additions, so chunks, streaming batches and partitioned
+    tiles can each build their own rollup and combine them in any order with
+    the same result. Quantiles are read from the histogram and clamped to the
+    exact minimum and maximum.
+    """
+
+    def __init__(self, by, columns, bins=SKETCH_BINS, score_range=SCORE_RANGE):
+        """
+        Args:
+            by (str): Column holding the group of each plot
+            columns (list): Score columns to summarize
+            bins (int): Number of histogram bins kept per group and column
+            score_range (tuple): (low, high) range of the scores; values
+                outside it are counted in the edge bins
+        """
+        self.by = by
+        self.columns = list(columns)
+        self.bins = bins
+        self.score_range = tuple(score_range)
+        self.groups = {}
+
+        n_columns = len(self.columns)
+        self.plots = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros((0, n_columns), dtype=np.int64)
+        self.total = np.zeros((0, n_columns), dtype=np.float64)
+        self.minimum = np.zeros((0, n_columns), dtype=np.float64)
+        self.maximum = np.zeros((0, n_columns), dtype=np.float64)
+        self.sketch = np.zeros((0, n_columns, bins), dtype=np.uint32)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def _rows(self, names):
+        # Row of each group name, adding rows for new groups
+        rows = np.empty(len(names), dtype=np.int64)
+        for i, name in enumerate(names):
+            rows[i] = self.groups.setdefault(name, len(self.groups))
+
+        added = len(self.groups) - len(self.plots)
+        if added:
+            n_columns = len(self.columns)
+            self.plots = np.concatenate([self.plots, np.zeros(added, dtype=np.int64)])
+            self.count = np.concatenate([self.count, np.zeros((added, n_columns), dtype=np.int64)])
+            self.total = np.concatenate([self.total, np.zeros((added, n_columns))])
+            self.minimum = np.concatenate([self.minimum, np.full((added, n_columns), np.inf)])
+            self.maximum = np.concatenate([self.maximum, np.full((added, n_columns), -np.inf)])
+            self.sketch = np.concatenate([self.sketch, np.zeros((added, n_columns, self.bins), dtype=np.uint32)])
+        return rows
+
+    def add(self, scores_df):
+        """
+        Add a batch of scored plots.
+
+        Plots without a group are left out.
+
+        Args:
+            scores_df (DataFrame): Scored plots with the group column and any
+                of the score columns
+        """
+        if self.by not in scores_df.columns or len(scores_df) == 0:
+            return
+
+        codes, names = pd.factorize(scores_df[self.by])
+        grouped = codes >= 0
+        rows = self._rows([str(name) for name in names])[codes[grouped]]
+        n_groups = len(self.groups)
+        np.add.at(self.plots, rows, 1)
+
+        low, high = self.score_range
+        for j, column in enumerate(self.columns):
+            if column not in scores_df.columns:
+                continue
+            values = pd.to_numeric(scores_df[column], errors="coerce").to_numpy(dtype=np.float64)[grouped]
+            present = ~np.isnan(values)
+            column_rows, values = rows[present], values[present]
+
+            self.count[:, j] += np.bincount(column_rows, minlength=n_groups)
+            self.total[:, j] += np.bincount(column_rows, weights=values, minlength=n_groups)
+            np.minimum.at(self.minimum[:, j], column_rows, values)
+            np.maximum.at(self.maximum[:, j], column_rows, values)
+
+            bins = np.clip(((values - low) / (high - low) * self.bins).astype(np.int64), 0, self.bins - 1)
+            flat = np.bincount(column_rows * self.bins + bins, minlength=n_groups * self.bins)
+            self.sketch[:, j] += flat.reshape(n_groups, self.bins).astype(np.uint32)
+
+    def merge(self, other):
+        """
+        Add another rollup's plots to this one.
+
+        Args:
+            other (ScoreRollup): Rollup over the same group column, score
+                columns and bins
+
+        Returns:
+            ScoreRollup: This rollup
+        """
+        if (other.by, other.columns, other.bins, other.score_range) != \
+                (self.by, self.columns, self.bins, self.score_range):
+            raise ValueError(f"Cannot merge a rollup by {other.by} into one by {self.by} "
+                             f"with different columns or bins")
+
+        rows = self._rows(list(other.groups))
+        self.plots[rows] += other.plots
+        self.count[rows] += other.count
+        self.total[rows] += other.total
+        self.minimum[rows] = np.minimum(self.minimum[rows], other.minimum)
+        self.maximum[rows] = np.maximum(self.maximum[rows], other.maximum)
+        self.sketch[rows] += other.sketch
+        return self
+
+    def quantiles(self, qs=ROLLUP_QUANTILES):
+        """
+        Estimate score quantiles per group from the histograms.
+
+        Args:
+            qs (list): Quantiles between 0 and 1
+
+        Returns:
+            ndarray: (groups x columns x quantiles), NaN where a group has no scores
+        """
+        low, high = self.score_range
+        width = (high - low) / self.bins
+        cumulative = np.cumsum(self.sketch, axis=2, dtype=np.int64)
+
+        result = np.full(self.count.shape + (len(qs),), np.nan)
+        for k, q in enumerate(qs):
+            # Interpolate linearly inside the bin holding the target rank
+            target = q * self.count
+            bin_index = np.minimum((cumulative < target[..., None]).sum(axis=2), self.bins - 1)
+            in_bin = np.take_along_axis(self.sketch, bin_index[..., None], axis=2)[..., 0].astype(np.int64)
+            before = np.take_along_axis(cumulative, bin_index[..., None], axis=2)[..., 0] - in_bin
+            with np.errstate(invalid="ignore", divide="ignore"):
+                fraction = np.where(in_bin > 0, (target - before) / in_bin, 0.0)
+            estimate = low + (bin_index + np.clip(fraction, 0, 1)) * width
+            estimate = np.clip(estimate, self.minimum, self.maximum)
+            result[..., k] = np.where(self.count > 0, estimate, np.nan)
+        return result
+
+    def histograms(self, bins=HISTOGRAM_BINS):
+        """
+        Coarsen the sketches into histograms.
+
+        Args:
+            bins (int): Number of equal-width bins over the score range
+
+        Returns:
+            tuple: (counts, edges) with counts of shape (groups x columns x bins)
+        """
+        if self.bins % bins:
+            raise ValueError(f"{bins} histogram bins do not divide {self.bins} sketch bins")
+        counts = self.sketch.reshape(len(self.groups), len(self.columns), bins, -1).sum(axis=3, dtype=np.int64)
+        return counts, np.linspace(*self.score_range, bins + 1)
+
+    def to_frame(self, qs=ROLLUP_QUANTILES, histogram_bins=HISTOGRAM_BINS):
+        """
+        Build the rollup table, one row per group sorted by group name.
+
+        Args:
+            qs (list): Quantiles to report
+            histogram_bins (int): Number of histogram bins to report
+
+        Returns:
+            DataFrame: Plot count, then per score column the count, mean,
+                minimum, maximum, quantiles and histogram bin counts
+        """
+        quantiles = self.quantiles(qs)
+        counts, edges = self.histograms(histogram_bins)
+
+        columns = {self.by: list(self.groups), "plots": self.plots}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = self.total / self.count
+        for j, column in enumerate(self.columns):
+            present = self.count[:, j] > 0
+            columns[f"{column}_count"] = self.count[:, j]
+            columns[f"{column}_mean"] = means[:, j]
+            columns[f"{column}_min"] = np.where(present, self.minimum[:, j], np.nan)
+            columns[f"{column}_max"] = np.where(present, self.maximum[:, j], np.nan)
+            for k, q in enumerate(qs):
+                columns[f"{column}_p{round(q * 100)}"] = quantiles[:, j, k]
+            for b in range(histogram_bins):
+                columns[f"{column}_hist_{edges[b]:g}"] = counts[:, j, b]
+
+        return pd.DataFrame(columns).sort_values(self.by, kind="stable").reset_index(drop=True)
+
+    def save(self, path):
+        """
+        Save the rollup state so it can be merged later.
+
+        Args:
+            path (str): Output path, written as .npz data whatever its extension
+        """
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                meta=np.asarray(json.dumps({"by": self.by, "columns": self.columns, "bins": self.bins,
+                                            "score_range": self.score_range})),
+                groups=np.asarray(list(self.groups), dtype=str),
+                plots=self.plots, count=self.count, total=self.total,
+                minimum=self.minimum, maximum=self.maximum, sketch=self.sketch
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a rollup written by save.
+
+        Args:
+            path (str): Path to the saved rollup
+
+        Returns:
+            ScoreRollup: The rollup
+        """
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            rollup = cls(meta["by"], meta["columns"], meta["bins"], meta["score_range"])
+            rollup.groups = {name: row for row, name in enumerate(data["groups"].tolist())}
+            for name in ["plots", "count", "total", "minimum", "maximum", "sketch"]:
+                setattr(rollup, name, data[name])
+        return rollup
+
+def new_rollups(columns, levels=ROLLUP_LEVELS):
+    """
+    Create empty rollups, one per grouping level.
+
+    Args:
+        columns (list): Score columns to summarize
+        levels (list): Grouping columns
+
+    Returns:
+        dict: Grouping column to ScoreRollup
+    """
+    return {level: ScoreRollup(level, columns) for level in levels}
+
+def update_rollups(rollups, scores_df):
+    """
+    Add a batch of scored plots to every rollup, creating them on first use.
+
+    Args:
+        rollups (dict): Grouping column to ScoreRollup, may be empty
+        scores_df (DataFrame): Scored plots
+
+    Returns:
+        dict: The rollups
+    """
+    if not rollups:
+        rollups.update(new_rollups(score_columns(scores_df.columns)))
+    for rollup in rollups.values():
+        rollup.add(scores_df)
+    return rollups
+
+def merge_rollups(rollups, other):
+    """
+    Merge one set of rollups into another.
+
+    Args:
+        rollups (dict): Grouping column to ScoreRollup, updated in place
+        other (dict): Grouping column to ScoreRollup
+
+    Returns:
+        dict: The merged rollups
+    """
+    for level, rollup in other.items():
+        if level in rollups:
+            rollups[level].merge(rollup)
+        else:
+            rollups[level] = rollup
+    return rollups
+
+def save_rollups(rollups, output_prefix):
+    """
+    Save rollup states as <output_prefix>-<level>.npz.
+
+    Args:
+        rollups (dict): Grouping column to ScoreRollup
+        output_prefix (str): Path prefix of the state files
+
+    Returns:
+        list: Paths written
+    """
+    paths = []
+    for level, rollup in rollups.items():
+        path = f"{output_prefix}-{level}.npz"
+        rollup.save(path)
+        paths.append(path)
+    return paths
+
+def load_rollups(paths):
+    """
+    Load and merge saved rollup states.
+
+    Args:
+        paths (list): Files written by save_rollups or ScoreRollup.save
+
+    Returns:
+        dict: Grouping column to merged ScoreRollup
+    """
+    rollups = {}
+    for path in paths:
+        rollup = ScoreRollup.load(path)
+        merge_rollups(rollups, {rollup.by: rollup})
+    return rollups
+
+def write_rollup_tables(rollups, output_prefix):
+    """
+    Write one CSV rollup table per grouping level as <output_prefix>-<level>.csv.
+
+    Args:
+        rollups (dict): Grouping column to ScoreRollup
+        output_prefix (str): Path prefix of the tables
+
+    Returns:
+        list: Paths written
+    """
+    paths = []
+    for level, rollup in rollups.items():
+        if not len(rollup):
+            continue
+        path = f"{output_prefix}-{level}.csv"
+        rollup.to_frame().to_csv(path, index=False, float_format="%.6f")
+        paths.append(path)
+    return paths
+
+def print_rollup_summary(rollups, level="CouncilArea"):
+    """
+    Print plot counts and overall score quantiles per group.
+
+    Args:
+        rollups (dict): Grouping column to ScoreRollup
+        level (str): Grouping level to print
+    """
+    rollup = rollups.get(level)
+    if rollup is None or not len(rollup) or "overallScore" not in rollup.columns:
+        return
+    table = rollup.to_frame()
+    print(f"\nScores by {level}:")
+    for _, row in table.iterrows():
+        print(f"  {row[level]:<32} {row['plots']:>7} plots, mean {row['overallScore_mean']:.2f}, "
+              f"median {row['overallScore_p50']:.2f}, p90 {row['overallScore_p90']:.2f}")
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Merge score rollups and write the rollup tables.")
+    parser.add_argument("inputs", nargs="*", default=["./00-data/geojson/scored-empty-lands.geojson"],
+                        help="Saved rollup states (.npz) to merge, or scored lands GeoJSON to roll up")
+    parser.add_argument("--output", default="./00-data/geojson/scored-empty-lands-rollup",
+                        help="Path prefix of the rollup tables")
+    args = parser.parse_args(argv)
+
+    rollups = {}
+    for path in args.inputs:
+        if path.endswith(".npz"):
+            merge_rollups(rollups, load_rollups([path]))
+        else:
+            import geopandas as gpd
+            print(f"Loading scored lands from {path}...")
+            update_rollups(rollups, gpd.read_file(path))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    for path in write_rollup_tables(rollups, args.output):
+        print(f"Saved rollup table to {path}")
+    print_rollup_summary(rollups)
+
+if __name__ == "__main__":
+    main()
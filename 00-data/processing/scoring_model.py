@@ -0,0 +1,234 @@
+import json
+import numpy as np
+
+# Categories and the metrics that contribute to each of them
+CATEGORIES = [
+    {
+        "heading": "Eradicating_Child_Poverty",
+        "metrics": [
+            "HEALTH OUTCOMES",
+            "CHILDREN IN FAMILIES WITH LIMITED RESOURCES",
+            "CHILD BENEFIT"
+        ]
+    },
+    {
+        "heading": "Growing_the_Economy",
+        "metrics": [
+            "INDEX OF MULTIPLE DEPRIVATION",
+            "BUSINESS DEMOGRAPHY",
+            "ECONOMIC ACTIVITY",
+            "HOUSE SALES PRICE",
+            "EARNINGS",
+            "UNDEREMPLOYMENT"
+        ]
+    },
+    {
+        "heading": "Tackling_the_Climate_Emergency",
+        "metrics": [
+            "CAR OWNERSHIP",
+            "HOUSING QUALITY",
+            "ENERGY CONSUMPTION",
+            "POPULATION ESTIMATES"
+        ]
+    },
+    {
+        "heading": "Ensuring_High_Quality_and_Sustainable_Public_Services",
+        "metrics": [
+            "LOCAL SERVICE SATISFACTION",
+            "ACCESS TO PUBLIC TRANSPORT",
+            "BUS ACCESSIBILITY",
+            "GEOGRAPHIC ACCESS TO SERVICES INDICATOR"
+        ]
+    }
+]
+
+# Metrics with negative impact (where higher values are worse)
+NEGATIVE_IMPACT_METRICS = [
+    "norm_CHILDREN IN FAMILIES WITH LIMITED RESOURCES",
+    "norm_INDEX OF MULTIPLE DEPRIVATION",
+    "norm_ENERGY CONSUMPTION",
+    "norm_CHILD BENEFIT",
+    "norm_HEALTH OUTCOMES",
+    "norm_GEOGRAPHIC ACCESS TO SERVICES INDICATOR"
+]
+
+# Per-plot metrics, by category heading. They are computed for each plot
+# (see station_proximity.py) rather than read from datazone columns, so they
+# are scored with the plots but left out of all_metrics() by default; datazone
+# consumers such as DatazoneTable, the datazone lookup and isochrone.js only
+# ever see datazone metrics.
+PLOT_METRICS = {
+    "Ensuring_High_Quality_and_Sustainable_Public_Services": [
+        "NEAREST STATION DISTANCE",
+        "STATIONS WITHIN WALKING DISTANCE"
+    ]
+}
+
+# Per-plot metrics with negative impact
+PLOT_NEGATIVE_IMPACT_METRICS = [
+    "norm_NEAREST STATION DISTANCE"
+]
+
+def all_metrics(categories=None, plot_metrics=False):
+    """
+    List every metric in category order.
+
+    Args:
+        categories (list): Category definitions, defaults to CATEGORIES
+        plot_metrics (bool): Also list the per-plot metrics of PLOT_METRICS,
+            after the datazone metrics
+
+    Returns:
+        list: Metric names (without the norm_ prefix)
+    """
+    if categories is None:
+        categories = CATEGORIES
+
+    metrics = []
+    for category in categories:
+        metrics.extend(category["metrics"])
+    if plot_metrics:
+        for category in categories:
+            metrics.extend(PLOT_METRICS.get(category["heading"], []))
+    return metrics
+
+def load_weights_config(path):
+    """
+    Load a weights/polarity config from a JSON file.
+
+    The file may contain any of:
+        "categories": {heading: weight}
+        "metrics": {metric: weight}
+        "negative_impact_metrics": [metric, ...]
+    Metric names may be given with or without the norm_ prefix.
+
+    Args:
+        path (str): Path to the JSON config
+
+    Returns:
+        dict: Weights config
+    """
+    with open(path, "r") as f:
+        config = json.load(f)
+
+    unknown = set(config) - {"categories", "metrics", "negative_impact_metrics"}
+    if unknown:
+        raise ValueError(f"Unknown keys in weights config: {', '.join(sorted(unknown))}")
+
+    return config
+
+def _strip_prefix(metric):
+    return metric[len("norm_"):] if metric.startswith("norm_") else metric
+
+def build_weights(metrics, config=None, categories=None):
+    """
+    Build the weight arrays for a set of metric columns.
+
+    Args:
+        metrics (list): Metric names, in matrix column order
+        config (dict): Weights config, defaults to equal weights
+        categories (list): Category definitions, defaults to CATEGORIES
+
+    Returns:
+        tuple: (metric_weights, category_matrix, negative_mask, headings) where
+            metric_weights is the overall weight of each metric, category_matrix
+            is a (metrics x categories) weight matrix and negative_mask flags
+            metrics where higher values are worse
+    """
+    if categories is None:
+        categories = CATEGORIES
+    if config is None:
+        config = {}
+
+    category_weights = config.get("categories", {})
+    metric_weights_config = {_strip_prefix(k): v for k, v in config.get("metrics", {}).items()}
+    if "negative_impact_metrics" in config:
+        negative = {_strip_prefix(m) for m in config["negative_impact_metrics"]}
+    else:
+        negative = {_strip_prefix(m) for m in NEGATIVE_IMPACT_METRICS + PLOT_NEGATIVE_IMPACT_METRICS}
+
+    headings = [category["heading"] for category in categories]
+    unknown = set(category_weights) - set(headings)
+    if unknown:
+        raise ValueError(f"Unknown categories in weights config: {', '.join(sorted(unknown))}")
+
+    metric_names = [_strip_prefix(m) for m in metrics]
+    metric_weights = np.zeros(len(metric_names), dtype=np.float32)
+    category_matrix = np.zeros((len(metric_names), len(headings)), dtype=np.float32)
+    negative_mask = np.array([m in negative for m in metric_names], dtype=bool)
+
+    for j, category in enumerate(categories):
+        cat_weight = float(category_weights.get(category["heading"], 1.0))
+        for metric in category["metrics"] + PLOT_METRICS.get(category["heading"], []):
+            if metric not in metric_names:
+                continue
+            i = metric_names.index(metric)
+            weight = float(metric_weights_config.get(metric, 1.0))
+            category_matrix[i, j] = weight
+            metric_weights[i] = weight * cat_weight
+
+    return metric_weights, category_matrix, negative_mask, headings
+
+def score_matrix(norm_means, metrics, config=None, categories=None):
+    """
+    Score every plot from its per-metric catchment means in one matrix operation.
+
+    Missing metrics (NaN) are left out of both the weighted sum and the weight
+    total, so with equal weights a score is the plain mean of the metric
+    scores a plot has.
+
+    Args:
+        norm_means (ndarray): (plots x metrics) matrix of normalized means
+        metrics (list): Metric names, in matrix column order
+        config (dict): Weights config, defaults to equal weights
+        categories (list): Category definitions, defaults to CATEGORIES
+
+    Returns:
+        dict: overallScore array and one array per category heading
+    """
+    metric_weights, category_matrix, negative_mask, headings = build_weights(metrics, config, categories)
+
+    norm_means = np.asarray(norm_means, dtype=np.float32)
+    present = ~np.isnan(norm_means)
+    values = np.where(negative_mask, 1 - norm_means, norm_means)
+    values = np.where(present, values, 0).astype(np.float32)
+    present = present.astype(np.float32)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        overall = (values @ metric_weights) / (present @ metric_weights)
+        category_scores = (values @ category_matrix) / (present @ category_matrix)
+
+    result = {"overallScore": np.nan_to_num(overall, nan=0.0)}
+    for j, heading in enumerate(headings):
+        result[heading] = category_scores[:, j]
+    return result
+
+def save_metric_means(path, ids, norm_means, metrics):
+    """
+    Persist per-plot metric means as a compact float32 matrix.
+
+    Args:
+        path (str): Output .npz path
+        ids (array-like): Plot ids, one per row
+        norm_means (ndarray): (plots x metrics) matrix of normalized means
+        metrics (list): Metric names, in matrix column order
+    """
+    np.savez_compressed(
+        path,
+        ids=np.asarray(ids, dtype=np.int64),
+        means=np.asarray(norm_means, dtype=np.float32),
+        metrics=np.asarray(metrics, dtype=str)
+    )
+
+def load_metric_means(path):
+    """
+    Load a matrix written by save_metric_means.
+
+    Args:
+        path (str): Path to the .npz file
+
+    Returns:
+        tuple: (ids, norm_means, metrics)
+    """
+    with np.load(path) as data:
+        return data["ids"], data["means"], data["metrics"].tolist()
@@ -0,0 +1,176 @@
+import argparse
+import time
+import numpy as np
+from scoring_model import build_weights, load_weights_config, load_metric_means
+
+# Weight draws scored per matrix product; bounds memory to plots x DRAW_BLOCK scores
+DRAW_BLOCK = 128
+
+# Rank histogram bins per plot; rank percentiles are resolved to 1 / RANK_BINS of the plots
+RANK_BINS = 100
+
+def draw_weights(rng, category_matrix, size, concentration=1.0, jitter=0.2, category_weights=None):
+    """
+    Draw random metric weight vectors.
+
+    Category weights come from a Dirichlet distribution centred on the
+    configured category weights; every metric weight is then multiplied by
+    log-normal jitter.
+
+    Args:
+        rng (Generator): Random number generator
+        category_matrix (ndarray): (metrics x categories) weight matrix from build_weights
+        size (int): Number of draws
+        concentration (float): Dirichlet concentration per category; larger
+            values keep draws closer to the configured weights
+        jitter (float): Standard deviation of the log of the per-metric jitter
+        category_weights (ndarray): Configured weight per category, defaults to equal
+
+    Returns:
+        ndarray: (metrics x size) float32 weight matrix, one column per draw
+    """
+    n_categories = category_matrix.shape[1]
+    if category_weights is None:
+        category_weights = np.ones(n_categories)
+    alpha = concentration * n_categories * np.asarray(category_weights, dtype=np.float64) / np.sum(category_weights)
+
+    categories = rng.dirichlet(alpha, size=size).T
+    weights = category_matrix.astype(np.float64) @ categories
+    if jitter > 0:
+        weights *= rng.lognormal(0.0, jitter, size=weights.shape)
+    return weights.astype(np.float32)
+
+def rank_columns(scores):
+    """
+    Rank plots within every column of a score block, best first.
+
+    Args:
+        scores (ndarray): (plots x draws) score matrix
+
+    Returns:
+        ndarray: (plots x draws) int32 zero-based ranks
+    """
+    order = np.argsort(-scores, axis=0, kind="stable")
+    ranks = np.empty(scores.shape, dtype=np.int32)
+    np.put_along_axis(ranks, order, np.arange(scores.shape[0], dtype=np.int32)[:, None], axis=0)
+    return ranks
+
+def sensitivity_analysis(norm_means, metrics, draws=1000, top_n=(10, 100), config=None, concentration=1.0,
+                         jitter=0.2, seed=0, block=DRAW_BLOCK, rank_bins=RANK_BINS):
+    """
+    Score all plots under many random weight vectors and summarize their ranks.
+
+    Each block of draws is scored with two matrix products over the plots'
+    metric means, ranked, and folded into per-plot rank counts, so memory
+    depends on the block size and not on the number of draws.
+
+    Args:
+        norm_means (ndarray): (plots x metrics) matrix of normalized means
+        metrics (list): Metric names, in matrix column order
+        draws (int): Number of weight vectors to draw
+        top_n (tuple): Rank cut-offs to report the probability of being within
+        config (dict): Weights config the draws are centred on, defaults to equal weights
+        concentration (float): Dirichlet concentration per category
+        jitter (float): Standard deviation of the log of the per-metric jitter
+        seed (int): Random seed
+        block (int): Draws scored per matrix product
+        rank_bins (int): Rank histogram bins per plot
+
+    Returns:
+        dict: Per-plot arrays of baseRank, meanRank, rank percentiles
+            (rankP5, rankP50, rankP95) and top-N probabilities (pTop<N>);
+            ranks are 1-based
+    """
+    metric_weights, category_matrix, negative_mask, headings = build_weights(metrics, config)
+    category_weights = [float((config or {}).get("categories", {}).get(heading, 1.0)) for heading in headings]
+
+    norm_means = np.asarray(norm_means, dtype=np.float32)
+    present = ~np.isnan(norm_means)
+    values = np.where(present, np.where(negative_mask, 1 - norm_means, norm_means), 0).astype(np.float32)
+    present = present.astype(np.float32)
+    n = len(values)
+
+    def score(weights):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nan_to_num((values @ weights) / (present @ weights), nan=0.0)
+
+    base_rank = rank_columns(score(metric_weights[:, None]))[:, 0]
+
+    rng = np.random.default_rng(seed)
+    rank_sum = np.zeros(n, dtype=np.float64)
+    top_counts = {k: np.zeros(n, dtype=np.int64) for k in top_n}
+    histogram = np.zeros(n * rank_bins, dtype=np.int32)
+    plot_offsets = (np.arange(n, dtype=np.int64) * rank_bins)[:, None]
+
+    for start in range(0, draws, block):
+        size = min(block, draws - start)
+        weights = draw_weights(rng, category_matrix, size, concentration, jitter, category_weights)
+        ranks = rank_columns(score(weights))
+
+        rank_sum += ranks.sum(axis=1)
+        for k in top_n:
+            top_counts[k] += (ranks < k).sum(axis=1)
+        bins = (ranks.astype(np.int64) * rank_bins) // max(n, 1)
+        histogram += np.bincount((plot_offsets + bins).ravel(), minlength=n * rank_bins)
+
+    # Rank at each percentile: upper edge of the first bin reaching it
+    cumulative = histogram.reshape(n, rank_bins).cumsum(axis=1)
+    bin_edges = np.ceil(np.arange(1, rank_bins + 1) * n / rank_bins).astype(np.int64)
+    result = {
+        "baseRank": base_rank + 1,
+        "meanRank": rank_sum / max(draws, 1) + 1
+    }
+    for percentile in (5, 50, 95):
+        first_bin = (cumulative < np.ceil(percentile / 100 * draws)).sum(axis=1)
+        result[f"rankP{percentile}"] = bin_edges[np.minimum(first_bin, rank_bins - 1)]
+    for k in top_n:
+        result[f"pTop{k}"] = top_counts[k] / max(draws, 1)
+    return result
+
+def write_sensitivity_csv(output_file, ids, result):
+    """
+    Write a sensitivity summary as a CSV with one row per plot.
+
+    Args:
+        output_file (str): Path to the CSV file
+        ids (ndarray): Plot ids
+        result (dict): Per-plot arrays from sensitivity_analysis
+    """
+    names = list(result)
+    table = np.column_stack([ids.astype(np.float64)] + [result[name].astype(np.float64) for name in names])
+    formats = ["%d"] + ["%.6f" if name.startswith("pTop") or name == "meanRank" else "%d" for name in names]
+    np.savetxt(output_file, table, delimiter=",", header=",".join(["id"] + names), comments="", fmt=formats)
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Monte Carlo sensitivity of plot rankings to the scoring weights.")
+    parser.add_argument("--means", default="./00-data/geojson/scored-empty-lands-metrics.npz",
+                        help="Metric means matrix written by generate_scored_lands.py")
+    parser.add_argument("--weights", help="JSON weights config to centre the draws on (default: equal weights)")
+    parser.add_argument("--draws", type=int, default=1000, help="Number of weight vectors to draw")
+    parser.add_argument("--top", type=int, nargs="+", default=[10, 100], help="Top-N cut-offs to report")
+    parser.add_argument("--concentration", type=float, default=1.0,
+                        help="Dirichlet concentration per category; larger keeps draws closer to the weights")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Log-normal sigma of the per-metric jitter")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--block", type=int, default=DRAW_BLOCK, help="Draws scored per matrix product")
+    parser.add_argument("--output", default="./00-data/geojson/scored-empty-lands-sensitivity.csv")
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    ids, norm_means, metrics = load_metric_means(args.means)
+    config = load_weights_config(args.weights) if args.weights else None
+    result = sensitivity_analysis(norm_means, metrics, args.draws, args.top, config, args.concentration,
+                                  args.jitter, args.seed, args.block)
+    print(f"Scored {len(ids)} plots under {args.draws} weight draws in {time.time() - start_time:.1f} seconds")
+
+    write_sensitivity_csv(args.output, ids, result)
+    print(f"Saved rank sensitivity to {args.output}")
+
+if __name__ == "__main__":
+    main()
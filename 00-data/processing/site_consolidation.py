@@ -0,0 +1,146 @@
+import numpy as np
+import geopandas as gpd
+import shapely
+from geometry_metrics import PROJECTED_CRS, projected_geometry_array
+
+def adjacent_pairs(geometries, tolerance=0.0):
+    """
+    Find every pair of touching or overlapping geometries with one bulk query.
+
+    Args:
+        geometries (ndarray): Projected shapely geometries
+        tolerance (float): Also pair geometries up to this many meters apart
+
+    Returns:
+        tuple: (left, right) index arrays with left < right
+    """
+    tree = shapely.STRtree(geometries)
+    if tolerance > 0:
+        left, right = tree.query(geometries, predicate="dwithin", distance=tolerance)
+    else:
+        left, right = tree.query(geometries, predicate="intersects")
+    keep = left < right
+    return left[keep], right[keep]
+
+def union_find_labels(n, left, right):
+    """
+    Label the connected components of a graph with a vectorized union-find.
+
+    Each round hooks the larger root of every edge under the smaller one,
+    then compresses paths by pointer jumping until every node points at its
+    root. Every round is a handful of whole-array operations.
+
+    Args:
+        n (int): Number of nodes
+        left (ndarray): Edge start nodes
+        right (ndarray): Edge end nodes
+
+    Returns:
+        ndarray: Component label per node, the smallest node in its component
+    """
+    parent = np.arange(n)
+    while True:
+        left_root, right_root = parent[left], parent[right]
+        linked = left_root != right_root
+        if not linked.any():
+            return parent
+        low = np.minimum(left_root[linked], right_root[linked])
+        high = np.maximum(left_root[linked], right_root[linked])
+        np.minimum.at(parent, high, low)
+
+        # Parents never point at a larger node, so this always terminates
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+def grouped_union(geometries, starts, ends):
+    """
+    Dissolve contiguous groups of geometries, one union per group.
+
+    Groups are padded with None into one (groups x width) array per
+    power-of-two size class and dissolved with a single union_all over its
+    rows, so the number of calls grows with the log of the largest group
+    rather than the number of groups.
+
+    Args:
+        geometries (ndarray): Shapely geometries, each group stored contiguously
+        starts (ndarray): Start of each group in geometries
+        ends (ndarray): End of each group in geometries
+
+    Returns:
+        ndarray: The union of each group
+    """
+    sizes = ends - starts
+    unions = np.empty(len(sizes), dtype=object)
+    if len(sizes) == 0:
+        return unions
+
+    widths = 1 << np.ceil(np.log2(np.maximum(sizes, 1))).astype(np.int64)
+    for width in np.unique(widths):
+        groups = np.flatnonzero(widths == width)
+        offsets = np.arange(width)
+        filled = offsets[None, :] < sizes[groups, None]
+        padded = np.full((len(groups), width), None, dtype=object)
+        padded[filled] = geometries[(starts[groups, None] + offsets[None, :])[filled]]
+        unions[groups] = shapely.union_all(padded, axis=1)
+    return unions
+
+def consolidate_sites(empty_lands_gdf, id_column="osmWayId", tolerance=0.0, projected=None,
+                      return_projected=False):
+    """
+    Merge touching or overlapping plots into single development sites.
+
+    Plots that share an edge, a corner or any area end up in one site, with
+    chains of adjacent plots merged transitively. Plots touching nothing are
+    passed through untouched, so only real clusters are dissolved.
+
+    Args:
+        empty_lands_gdf (GeoDataFrame): Plots, with their OSM way id in id_column
+        id_column (str): Column holding each plot's way id
+        tolerance (float): Also merge plots up to this many meters apart
+        projected (ndarray): The plots' geometries already in PROJECTED_CRS,
+            projected here if None
+        return_projected (bool): Also return the sites' geometries in PROJECTED_CRS
+
+    Returns:
+        GeoDataFrame: One row per site with the member way ids in osmWayIds,
+            in the input CRS, and with return_projected a tuple of that frame
+            and the projected site geometries
+    """
+    geometries = np.asarray(empty_lands_gdf.geometry.values)
+    if projected is None:
+        projected = projected_geometry_array(empty_lands_gdf, PROJECTED_CRS)
+    projected = np.asarray(projected)
+    n = len(geometries)
+
+    left, right = adjacent_pairs(projected, tolerance)
+    labels = union_find_labels(n, left, right)
+
+    # Group plots by site, keeping the order of each site's first plot
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    starts = np.flatnonzero(np.r_[True, sorted_labels[1:] != sorted_labels[:-1]])
+    ends = np.r_[starts[1:], n]
+
+    if id_column in empty_lands_gdf.columns:
+        way_ids = empty_lands_gdf[id_column].to_numpy()
+    else:
+        way_ids = np.arange(n)
+
+    site_geometries = geometries[order[starts]].copy()
+    members = [way_ids[order[start:end]].tolist() for start, end in zip(starts, ends)]
+    merged_sites = np.flatnonzero(ends - starts > 1)
+    site_geometries[merged_sites] = grouped_union(geometries[order], starts[merged_sites], ends[merged_sites])
+
+    sites_gdf = gpd.GeoDataFrame({"osmWayIds": members}, geometry=site_geometries, crs=empty_lands_gdf.crs)
+    print(f"Consolidated {n} plots into {len(sites_gdf)} sites ({len(merged_sites)} sites merged from several plots)")
+    if not return_projected:
+        return sites_gdf
+
+    # Single-plot sites keep their projected geometry; only merged ones are projected
+    site_projected = projected[order[starts]].copy()
+    if len(merged_sites):
+        site_projected[merged_sites] = projected_geometry_array(sites_gdf.iloc[merged_sites], PROJECTED_CRS)
+    return sites_gdf, site_projected
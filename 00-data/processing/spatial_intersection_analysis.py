@@ -15,12 +15,26 @@ import sys
 import pandas as pd
 from shapely.geometry import Point
 import numpy as np
+from geometry_validation import VALIDATION_CACHE_FILE, validate_frame
 
-def main():
-    # File paths with correct directory structure
-    datazones_file = "00-data\\geojson\\datazones2011.geojson"
-    councilzones_file = "00-data\\geojson\\councilzones.geojson"
-    output_file = "00-data\\geojson\\datazones2011_with_local_auth.geojson"
+def main(datazones_file="./00-data/geojson/datazones2011.geojson",
+         councilzones_file="./00-data/geojson/councilzones.geojson",
+         output_file="./00-data/geojson/datazones2011_with_local_auth.geojson",
+         data_dir="./00-data"):
+    """
+    Assign each data zone the local_auth of the council zone it lies in.
+    
+    Args:
+        datazones_file (str): Data zones GeoJSON
+        councilzones_file (str): Council zones GeoJSON with a local_auth column
+        output_file (str): Path of the data zones GeoJSON with local_auth added;
+            the validation reports are written next to it
+        data_dir (str): Directory holding the shared geometry validation cache
+    """
+    output_dir = os.path.dirname(output_file)
+    validation_cache_file = os.path.join(data_dir, VALIDATION_CACHE_FILE)
+    datazones_report_file = os.path.join(output_dir, "datazones2011_validation_report.json")
+    councilzones_report_file = os.path.join(output_dir, "councilzones_validation_report.json")
     
     # Define target CRS - EPSG:4326 (WGS 84)
     target_crs = "EPSG:4326"
@@ -65,9 +79,13 @@ def main():
         
         print(f"Processing {len(datazones_gdf)} data zones and {len(councilzones_gdf)} council zones...")
         
-        # Fix any invalid geometries
-        datazones_gdf['geometry'] = datazones_gdf['geometry'].buffer(0)
-        councilzones_gdf['geometry'] = councilzones_gdf['geometry'].buffer(0)
+        # Repair only the invalid geometries, reusing validity flags from earlier runs
+        datazones_gdf = validate_frame(datazones_gdf, "data zones", id_column="DataZone",
+                                       cache_path=validation_cache_file,
+                                       report_path=datazones_report_file)
+        councilzones_gdf = validate_frame(councilzones_gdf, "council zones", id_column="local_auth",
+                                          cache_path=validation_cache_file,
+                                          report_path=councilzones_report_file)
         
         # Add local_auth column to datazones if it doesn't exist
         if 'local_auth' in datazones_gdf.columns:
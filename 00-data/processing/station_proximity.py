@@ -0,0 +1,163 @@
+import json
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from geometry_metrics import PROJECTED_CRS, projected_geometry_array
+
+# Number of nearest stations reported per plot
+STATION_NEIGHBOURS = 3
+
+# Distance in meters at which the nearest station stops counting as close
+STATION_DISTANCE_SCALE = 5000.0
+
+# Stations within walking distance at which access counts as full
+STATION_COUNT_SCALE = 4
+
+# Scored per-plot metrics, listed in the public services category
+NEAREST_STATION_DISTANCE = "NEAREST STATION DISTANCE"
+STATIONS_WITHIN_WALKING_DISTANCE = "STATIONS WITHIN WALKING DISTANCE"
+
+def load_stations(stations_file):
+    """
+    Load railway station points from a local file.
+
+    Accepts either the Overpass JSON returned by the railway station query in
+    map-data.js (node elements with lat/lon) or any point file geopandas reads.
+
+    Args:
+        stations_file (str): Path to the stations file
+
+    Returns:
+        GeoDataFrame: Station points with a name column, in EPSG:4326
+    """
+    if stations_file.endswith(".json"):
+        with open(stations_file, "r") as f:
+            data = json.load(f)
+        if "elements" in data:
+            nodes = [el for el in data["elements"] if el.get("type") == "node" and "lat" in el]
+            return gpd.GeoDataFrame(
+                {"name": [el.get("tags", {}).get("name", str(el["id"])) for el in nodes]},
+                geometry=gpd.points_from_xy([el["lon"] for el in nodes], [el["lat"] for el in nodes]),
+                crs="EPSG:4326"
+            )
+
+    stations_gdf = gpd.read_file(stations_file)
+    if stations_gdf.crs is None:
+        stations_gdf = stations_gdf.set_crs("EPSG:4326")
+    if "name" not in stations_gdf.columns:
+        stations_gdf["name"] = stations_gdf.index.astype(str)
+    return stations_gdf[["name", "geometry"]]
+
+class StationIndex:
+    """
+    Projected station points, their names and a spatial index over them.
+
+    Build it once per run and share it between chunks, batches or threads;
+    STRtree queries are read-only.
+    """
+
+    def __init__(self, stations_gdf):
+        """
+        Args:
+            stations_gdf (GeoDataFrame): Station points with a name column
+        """
+        station_points = projected_geometry_array(stations_gdf, PROJECTED_CRS)
+        self.xy = shapely.get_coordinates(np.asarray(station_points))
+        self.names = stations_gdf["name"].astype(str).to_numpy()
+        self.tree = shapely.STRtree(shapely.points(self.xy))
+
+    def __len__(self):
+        return len(self.xy)
+
+def nearest_stations(centroids, station_xy, k=STATION_NEIGHBOURS, start_distance=1000.0, tree=None):
+    """
+    Find the k nearest stations of every point with bulk spatial index queries.
+
+    All points are queried together against an STRtree of the stations within
+    start_distance; points with fewer than k stations in reach are queried
+    again with double the distance until every point has its k nearest.
+
+    Args:
+        centroids (ndarray): (n x 2) array of projected points
+        station_xy (ndarray): (m x 2) array of projected station points
+        k (int): Number of neighbours, capped at the number of stations
+        start_distance (float): Search distance of the first query in meters
+        tree (STRtree): Index over station_xy, built here if None
+
+    Returns:
+        tuple: (indices, distances, counts) where indices and distances are
+            (n x k) arrays ordered by distance, and counts is the number of
+            stations within start_distance of each point
+    """
+    n = len(centroids)
+    k = min(k, len(station_xy))
+    indices = np.full((n, k), -1, dtype=np.int64)
+    distances = np.full((n, k), np.nan, dtype=np.float64)
+    counts = np.zeros(n, dtype=np.int32)
+    if n == 0 or len(station_xy) == 0:
+        return indices, distances, counts
+
+    if tree is None:
+        tree = shapely.STRtree(shapely.points(station_xy))
+    pending = np.arange(n)
+    distance = start_distance
+    first_pass = True
+    while len(pending) > 0:
+        plot_idx, station_idx = tree.query(shapely.points(centroids[pending]), predicate="dwithin",
+                                           distance=distance)
+        pair_distances = np.hypot(*(centroids[pending[plot_idx]] - station_xy[station_idx]).T)
+
+        # Group pairs by point, nearest first
+        order = np.lexsort((pair_distances, plot_idx))
+        plot_idx, station_idx, pair_distances = plot_idx[order], station_idx[order], pair_distances[order]
+        starts = np.searchsorted(plot_idx, np.arange(len(pending) + 1))
+        found = np.diff(starts)
+        if first_pass:
+            counts[pending] = found
+            first_pass = False
+
+        done = found >= k
+        rank = np.arange(len(plot_idx)) - starts[plot_idx]
+        keep = (rank < k) & done[plot_idx]
+        rows = pending[plot_idx[keep]]
+        indices[rows, rank[keep]] = station_idx[keep]
+        distances[rows, rank[keep]] = pair_distances[keep]
+
+        pending = pending[~done]
+        distance *= 2
+
+    return indices, distances, counts
+
+def station_features(centroids, stations, buffer_radius, k=STATION_NEIGHBOURS):
+    """
+    Calculate station proximity features for every plot in one pass.
+
+    The normalized values use fixed scales rather than the spread of the
+    input, so plots get the same values however the run is chunked or tiled.
+
+    Args:
+        centroids (ndarray): (n x 2) array of projected plot centroids
+        stations (StationIndex): Stations to measure proximity to
+        buffer_radius (float): Walking distance in meters
+        k (int): Number of nearest stations to report
+
+    Returns:
+        DataFrame: Raw and norm_ columns for the station metrics plus the
+            names and distances of the nearest stations, one row per plot
+    """
+    indices, distances, counts = nearest_stations(centroids, stations.xy, k, buffer_radius, stations.tree)
+
+    nearest = distances[:, 0] if distances.shape[1] else np.full(len(centroids), np.nan)
+    features = pd.DataFrame({
+        NEAREST_STATION_DISTANCE: nearest.astype(np.float32),
+        f"norm_{NEAREST_STATION_DISTANCE}": np.minimum(nearest / STATION_DISTANCE_SCALE, 1).astype(np.float32),
+        STATIONS_WITHIN_WALKING_DISTANCE: counts.astype(np.float32),
+        f"norm_{STATIONS_WITHIN_WALKING_DISTANCE}": np.minimum(counts / STATION_COUNT_SCALE, 1).astype(np.float32)
+    })
+    for i in range(indices.shape[1]):
+        features[f"nearestStation{i + 1}"] = np.where(indices[:, i] >= 0, stations.names[indices[:, i]], None)
+        features[f"nearestStationDistance{i + 1}"] = np.round(distances[:, i]).astype(np.float32)
+
+    print(f"Found nearest stations for {len(centroids)} plots among {len(stations)} stations")
+    return features
@@ -0,0 +1,339 @@
+import os
+import argparse
+import json
+import queue
+import shutil
+import threading
+import time
+import numpy as np
+from generate_scored_lands import (attach_scores, calculate_buffer_radius, convert_osm_to_geojson,
+                                   process_land_chunk, query_overpass_api)
+from osm_pbf import iter_pbf_empty_lands, set_pool_threads
+
+# Batches waiting between two stages; a full queue blocks the stage feeding it
+QUEUE_SIZE = 4
+
+# Plots per batch read from a .osm.pbf extract
+BATCH_SIZE = 5000
+
+# Size of one Overpass tile in degrees
+TILE_DEGREES = 0.25
+
+# Marks the end of a stage's output
+_DONE = object()
+
+def overpass_tiles(osm_bounding_zone, tile_degrees=TILE_DEGREES):
+    """
+    Split a bounding box into Overpass tiles.
+
+    Args:
+        osm_bounding_zone (str): Bounding box in format "south,west,north,east"
+        tile_degrees (float): Tile size in degrees
+
+    Returns:
+        list: Tile bounding boxes in the same format
+    """
+    south, west, north, east = (float(v) for v in osm_bounding_zone.split(","))
+    tiles = []
+    for lat in np.arange(south, north, tile_degrees):
+        for lon in np.arange(west, east, tile_degrees):
+            tiles.append(f"{lat:.6f},{lon:.6f},{min(lat + tile_degrees, north):.6f},"
+                         f"{min(lon + tile_degrees, east):.6f}")
+    return tiles
+
+def overpass_feature_batches(osm_bounding_zone, tile_degrees=TILE_DEGREES):
+    """
+    Fetch and convert empty lands one Overpass tile at a time.
+
+    Ways crossing a tile edge are returned by both tiles; only the first copy
+    is kept, which means holding the ids of the ways seen so far.
+
+    Args:
+        osm_bounding_zone (str): Bounding box in format "south,west,north,east"
+        tile_degrees (float): Tile size in degrees
+
+    Yields:
+        list: GeoJSON features of one tile
+    """
+    seen = set()
+    for tile in overpass_tiles(osm_bounding_zone, tile_degrees):
+        features = convert_osm_to_geojson(query_overpass_api(tile))["features"]
+        features = [feature for feature in features if feature["id"] not in seen]
+        seen.update(feature["id"] for feature in features)
+        yield features
+
+def score_batch(features, start, datazone_table, buffer_radius, stations=None):
+    """
+    Validate and score one batch of plots.
+
+    Args:
+        features (list): GeoJSON features of the batch
+        start (int): Id of the batch's first plot
+        datazone_table (DatazoneTable): Datazones with their spatial index built
+        buffer_radius (float): Buffer radius in meters
+        stations (StationIndex): Optional railway stations to score proximity to
+
+    Returns:
+        GeoDataFrame: Scored plots in EPSG:4326, with ids from start upwards
+    """
+    import geopandas as gpd
+    from geometry_metrics import PROJECTED_CRS, geometry_metrics, projected_geometry_array
+    from geometry_validation import validate_geometries
+    from station_proximity import station_features
+
+    empty_lands_gdf = gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
+    empty_lands_gdf["osmWayId"] = [feature.get("id") for feature in features]
+    empty_lands_gdf = empty_lands_gdf[["osmWayId", "geometry"]]
+
+    geometries, _ = validate_geometries(empty_lands_gdf.geometry.values)
+    empty_lands_gdf["geometry"] = geometries
+
+    plot_metrics = geometry_metrics(projected_geometry_array(empty_lands_gdf, PROJECTED_CRS))
+    centroids = plot_metrics[["centroid_x", "centroid_y"]].to_numpy()
+    positions = np.arange(start, start + len(centroids))
+    features_df = station_features(centroids, stations, buffer_radius) if stations is not None else None
+
+    scores_df = process_land_chunk((centroids, datazone_table, buffer_radius, positions, features_df))
+    return attach_scores(empty_lands_gdf, plot_metrics, [scores_df])
+
+class GeoJSONWriter:
+    """Writes a FeatureCollection one batch at a time."""
+
+    def __init__(self, output_file, crs_name="EPSG:4326"):
+        self.file = open(output_file, "w")
+        self.file.write('{"type": "FeatureCollection", ')
+        self.file.write(f'"crs": {json.dumps({"type": "name", "properties": {"name": crs_name}})}, ')
+        self.file.write('"features": [\n')
+        self.count = 0
+
+    def write(self, scored_lands_gdf):
+        for feature in json.loads(scored_lands_gdf.to_json())["features"]:
+            if self.count:
+                self.file.write(",\n")
+            self.file.write(json.dumps(feature))
+            self.count += 1
+
+    def close(self):
+        self.file.write("\n]}\n")
+        self.file.close()
+
+def _put(q, item, stop):
+    # Block while the queue is full, unless another stage failed
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            pass
+    return _DONE
+
+def stream_scored_lands(feature_batches, datazones_gdf, output_file, walking_radius_minutes=15,
+                        num_workers=None, queue_size=QUEUE_SIZE, stations_gdf=None):
+    """
+    Score plots as they arrive and write them out incrementally.
+
+    A reader thread pulls batches from feature_batches, scoring threads turn
+    them into scored frames and a writer thread appends those to the output.
+    The stages are joined by queues holding at most queue_size batches, so a
+    slow stage holds the others back and memory stays bounded by the batch
+    size rather than the region size. Scoring overlaps with fetching and
+    parsing, and the buffer and intersection query that dominate scoring
+    release the GIL.
+
+    Output features are in completion order; each keeps its arrival order
+    in id. Per-council and per-DataZone score rollups are updated from each
+    batch as it is written.
+
+    Args:
+        feature_batches (iterable): Lists of GeoJSON features
+        datazones_gdf (GeoDataFrame): GeoDataFrame of datazones
+        output_file (str): Output GeoJSON path
+        walking_radius_minutes (int): Walking time in minutes
+        num_workers (int): Scoring threads, defaults to all cores
+        queue_size (int): Batches buffered between stages
+        stations_gdf (GeoDataFrame): Optional railway stations to score proximity to
+
+    Returns:
+        dict: Plot count, score statistics and the score rollups
+    """
+    from datazone_table import DatazoneTable
+    from score_rollups import update_rollups
+    from station_proximity import StationIndex
+
+    num_workers = num_workers or os.cpu_count() or 1
+    buffer_radius = calculate_buffer_radius(walking_radius_minutes)
+
+    # One table and spatial index of each kind shared by every scoring thread
+    datazone_table = DatazoneTable(datazones_gdf)
+    datazone_table.ensure_tree()
+    stations = StationIndex(stations_gdf) if stations_gdf is not None else None
+
+    batches = queue.Queue(queue_size)
+    scored = queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+    stats = {"count": 0, "score_sum": 0.0, "min_score": np.inf, "max_score": -np.inf, "rollups": {}}
+
+    def run_stage(stage):
+        def run():
+            try:
+                stage()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        return run
+
+    def read():
+        start = 0
+        try:
+            for features in feature_batches:
+                if not features:
+                    continue
+                if not _put(batches, (start, features), stop):
+                    return
+                start += len(features)
+        finally:
+            for _ in range(num_workers):
+                _put(batches, _DONE, stop)
+
+    def score():
+        try:
+            while True:
+                item = _get(batches, stop)
+                if item is _DONE:
+                    return
+                start, features = item
+                if not _put(scored, score_batch(features, start, datazone_table, buffer_radius, stations), stop):
+                    return
+        finally:
+            _put(scored, _DONE, stop)
+
+    def write():
+        writer = GeoJSONWriter(output_file)
+        try:
+            finished = 0
+            while finished < num_workers:
+                scored_lands_gdf = _get(scored, stop)
+                if scored_lands_gdf is _DONE:
+                    finished += 1
+                    continue
+                writer.write(scored_lands_gdf)
+                scores = scored_lands_gdf["overallScore"]
+                stats["count"] += len(scores)
+                stats["score_sum"] += float(scores.sum())
+                stats["min_score"] = min(stats["min_score"], float(scores.min()))
+                stats["max_score"] = max(stats["max_score"], float(scores.max()))
+                update_rollups(stats["rollups"], scored_lands_gdf)
+                print(f"Wrote {stats['count']} scored lands")
+        finally:
+            writer.close()
+
+    threads = [threading.Thread(target=run_stage(read), name="reader"),
+               threading.Thread(target=run_stage(write), name="writer")]
+    threads += [threading.Thread(target=run_stage(score), name=f"scorer-{i}") for i in range(num_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return stats
+
+def remove_stale_outputs(output_file):
+    """
+    Remove the metric means and query index left next to an earlier output.
+
+    The stream writes no metric means or index, so ones from an earlier
+    scoring run at the same path would no longer match the GeoJSON and
+    re-weighting, sensitivity analysis and queries would mix the two.
+
+    Args:
+        output_file (str): Path of the output GeoJSON
+
+    Returns:
+        list: Paths removed
+    """
+    output_stem = os.path.splitext(output_file)[0]
+    removed = []
+    for path in [f"{output_stem}-metrics.npz", f"{output_stem}.index"]:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+        else:
+            continue
+        removed.append(path)
+    return removed
+
+def main(argv=None):
+    """
+    Main function to run the script.
+
+    Args:
+        argv (list): Command line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(description="Fetch, score and write empty lands as a streaming pipeline.")
+    parser.add_argument("--pbf", help="Read plots from a local .osm.pbf extract instead of Overpass")
+    parser.add_argument("--pbf-threads", type=int, help="Threads decoding the extract (default: all cores)")
+    parser.add_argument("--bbox", default="55.5,-4.8,56.0,-2.8", help="Bounding box as south,west,north,east")
+    parser.add_argument("--tile-degrees", type=float, default=TILE_DEGREES, help="Overpass tile size in degrees")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Plots per batch read from the extract")
+    parser.add_argument("--datazones", default="./00-data/geojson/datazones2011_data_normalized.geojson")
+    parser.add_argument("--stations", default="./00-data/railway-stations.json",
+                        help="Railway stations as Overpass JSON or GeoJSON, for station proximity metrics")
+    parser.add_argument("--workers", type=int, help="Scoring threads")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Batches buffered between stages")
+    parser.add_argument("--output", default="./00-data/geojson/streamed-empty-lands.geojson",
+                        help="Output GeoJSON; metric means and a query index left next to it are removed")
+    args = parser.parse_args(argv)
+
+    # Imported after parsing so that --help stays cheap
+    import geopandas as gpd
+    from score_rollups import print_rollup_summary, save_rollups, write_rollup_tables
+    from station_proximity import load_stations
+
+    start_time = time.time()
+
+    if args.pbf:
+        set_pool_threads(args.pbf_threads)
+        feature_batches = iter_pbf_empty_lands(args.pbf, batch_size=args.batch_size)
+    else:
+        feature_batches = overpass_feature_batches(args.bbox, args.tile_degrees)
+
+    print(f"Loading datazones from {args.datazones}...")
+    datazones_gdf = gpd.read_file(args.datazones)
+
+    stations_gdf = None
+    if args.stations and os.path.exists(args.stations):
+        print(f"Loading railway stations from {args.stations}...")
+        stations_gdf = load_stations(args.stations)
+
+    for path in remove_stale_outputs(args.output):
+        print(f"Removed {path}, which an earlier run wrote next to {args.output}")
+
+    stats = stream_scored_lands(feature_batches, datazones_gdf, args.output, num_workers=args.workers,
+                                queue_size=args.queue_size, stations_gdf=stations_gdf)
+
+    print(f"Successfully saved {stats['count']} scored lands to {args.output}")
+    if stats["count"]:
+        print("\nScore Statistics:")
+        print(f"Average Score: {stats['score_sum'] / stats['count']:.2f}")
+        print(f"Min Score: {stats['min_score']:.2f}")
+        print(f"Max Score: {stats['max_score']:.2f}")
+        rollup_prefix = f"{os.path.splitext(args.output)[0]}-rollup"
+        for path in write_rollup_tables(stats["rollups"], rollup_prefix) + save_rollups(stats["rollups"], rollup_prefix):
+            print(f"Saved rollup to {path}")
+        print_rollup_summary(stats["rollups"])
+    print(f"\nTotal processing time: {time.time() - start_time:.2f} seconds")
+
+if __name__ == "__main__":
+    main()
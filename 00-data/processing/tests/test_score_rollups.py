@@ -0,0 +1,95 @@
+import os
+import sys
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_scored_lands import process_empty_lands, process_empty_lands_approximate
+from score_rollups import ScoreRollup, merge_rollups, new_rollups, update_rollups
+from scoring_model import all_metrics
+
+# Side of each square datazone in meters, smaller than the walking catchment,
+# so every plot's catchment reaches several datazones
+ZONE_SIZE = 1000
+
+# Datazones listed right to left, so the lowest intersecting row is never
+# the one a plot lies in
+ZONES = [("DZ4", "East"), ("DZ3", "East"), ("DZ2", "West"), ("DZ1", "West")]
+
+# Plots per datazone, counted from the left
+PLOTS_PER_ZONE = [3, 1, 4, 2]
+
+def make_datazones():
+    metrics = all_metrics()[:3]
+    rows, geometries = [], []
+    for i, (zone, council) in enumerate(ZONES):
+        left = (len(ZONES) - 1 - i) * ZONE_SIZE
+        geometries.append(box(left, 0, left + ZONE_SIZE, ZONE_SIZE))
+        row = {"DataZone": zone, "CouncilArea": council}
+        for j, metric in enumerate(metrics):
+            row[metric] = float(10 * i + j)
+            row[f"norm_{metric}"] = (i + j) / 10
+        rows.append(row)
+    return gpd.GeoDataFrame(rows, geometry=geometries, crs="EPSG:27700")
+
+def make_plots():
+    # Small plots spread across each datazone, some close to its edges
+    geometries, expected = [], []
+    for column, count in enumerate(PLOTS_PER_ZONE):
+        zone = ZONES[len(ZONES) - 1 - column]
+        for k in range(count):
+            x = column * ZONE_SIZE + 20 + (k + 0.5) * (ZONE_SIZE - 40) / count
+            y = 20 + k * 150
+            geometries.append(box(x - 5, y - 5, x + 5, y + 5))
+            expected.append(zone)
+    plots = gpd.GeoDataFrame({"osmWayId": np.arange(len(geometries))}, geometry=geometries, crs="EPSG:27700")
+    return plots.to_crs("EPSG:4326"), expected
+
+def expected_groups(expected, level):
+    groups = {}
+    for zone, council in expected:
+        name = zone if level == "DataZone" else council
+        groups[name] = groups.get(name, 0) + 1
+    return groups
+
+def rollup_groups(rollup):
+    return {name: int(rollup.plots[row]) for name, row in rollup.groups.items()}
+
+@pytest.mark.parametrize("engine", ["exact", "approximate"])
+def test_rollups_group_plots_by_containing_datazone(engine):
+    plots, expected = make_plots()
+    rollups = {}
+    if engine == "exact":
+        scored = process_empty_lands(plots, make_datazones(), backend="thread", rollups=rollups)
+    else:
+        scored = process_empty_lands_approximate(plots, make_datazones(), resolution=25, sample_size=len(plots),
+                                                 rollups=rollups)
+
+    assert list(scored["DataZone"]) == [zone for zone, _ in expected]
+    assert list(scored["CouncilArea"]) == [council for _, council in expected]
+    for level in ["DataZone", "CouncilArea"]:
+        assert rollup_groups(rollups[level]) == expected_groups(expected, level)
+
+def test_merged_rollups_keep_group_membership():
+    plots, expected = make_plots()
+    scored = process_empty_lands(plots, make_datazones(), backend="thread")
+
+    whole = update_rollups({}, scored)
+    halves = new_rollups(list(whole["DataZone"].columns))
+    for part in np.array_split(np.arange(len(scored)), 2):
+        merge_rollups(halves, update_rollups({}, scored.iloc[part]))
+
+    for level in ["DataZone", "CouncilArea"]:
+        assert rollup_groups(halves[level]) == expected_groups(expected, level)
+        assert halves[level].to_frame().equals(whole[level].to_frame())
+
+def test_plots_without_group_are_left_out():
+    rollup = ScoreRollup("DataZone", ["overallScore"])
+    scored = gpd.GeoDataFrame({"DataZone": ["DZ1", None, "DZ1", "DZ2"], "overallScore": [0.2, 0.5, 0.4, 0.9]})
+    rollup.add(scored)
+
+    assert rollup_groups(rollup) == {"DZ1": 2, "DZ2": 1}
+    assert rollup.to_frame()["overallScore_mean"].tolist() == pytest.approx([0.3, 0.9])
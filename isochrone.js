@@ -1,16 +1,23 @@
 // Simple Isochrone Handler
 import SidebarModule from './sidebar-module.js';
+import { fetch_datazone_lookup } from './map-data.js';
 
 const SimpleIsochrone = {
   profile: 'walking',
   minutes: 15,
   marker: null,
   datazonesWithinIsochrone: [],
-  
+  lookup: null,
+
   init(map) {
     this.map = map;
     this.marker = new mapboxgl.Marker({ color: '#6666CC' });
-    
+
+    // Fall back to the rendered datazone polygons if the lookup is missing
+    fetch_datazone_lookup()
+      .then(lookup => { this.lookup = lookup; })
+      .catch(error => console.warn('Datazone lookup unavailable, using rendered datazones:', error));
+
     // Initialize the sidebar using the new module
     this.sidebar = SidebarModule.init({
       id: 'isochrone-sidebar',
@@ -113,6 +120,16 @@ const SimpleIsochrone = {
   },
   
   analyzeDatazonesWithinIsochrone(isochroneFeature) {
+    if (this.lookup) {
+      const isochronePolygon = isochroneFeature.geometry.coordinates[0];
+      if (!isochronePolygon || !Array.isArray(isochronePolygon)) return;
+
+      this.datazonesWithinIsochrone = this.lookupDatazonesWithin(isochronePolygon);
+      this.highlightDatazones(this.datazonesWithinIsochrone);
+      this.calculateDatazoneStatistics();
+      return;
+    }
+
     const datazonesSource = this.map.getSource('datazones');
     if (!datazonesSource) return;
     
@@ -141,10 +158,83 @@ const SimpleIsochrone = {
         features: datazonesWithin
       });
     }
+    this.highlightDatazones(datazonesWithin);
     
     this.calculateDatazoneStatistics();
   },
-  
+
+  lookupDatazonesWithin(polygon) {
+    const { lon, lat, cell_start, council, raw, norm, metrics, grid, zones, councils } = this.lookup;
+
+    let west = Infinity, south = Infinity, east = -Infinity, north = -Infinity;
+    polygon.forEach(([x, y]) => {
+      west = Math.min(west, x);
+      south = Math.min(south, y);
+      east = Math.max(east, x);
+      north = Math.max(north, y);
+    });
+
+    // Grid cells covering the isochrone's bounding box, padded by one cell
+    // so centroids stored as float32 near a cell edge are not missed
+    const cellOf = (value, origin, count) =>
+      Math.min(count - 1, Math.max(0, Math.floor((value - origin) / grid.cell_size)));
+    const x0 = Math.max(0, cellOf(west, grid.west, grid.columns) - 1);
+    const x1 = Math.min(grid.columns - 1, cellOf(east, grid.west, grid.columns) + 1);
+    const y0 = Math.max(0, cellOf(south, grid.south, grid.rows) - 1);
+    const y1 = Math.min(grid.rows - 1, cellOf(north, grid.south, grid.rows) + 1);
+
+    const metricCount = metrics.length;
+    const within = [];
+    for (let row = y0; row <= y1; row++) {
+      // Cells of a row are contiguous, so the row is one slice of zones
+      const start = cell_start[row * grid.columns + x0];
+      const end = cell_start[row * grid.columns + x1 + 1];
+      for (let i = start; i < end; i++) {
+        const x = lon[i], y = lat[i];
+        if (x < west || x > east || y < south || y > north) continue;
+        if (!this.pointInPolygon([x, y], polygon)) continue;
+
+        const properties = {
+          DataZone: zones ? zones[i] : null,
+          CouncilArea: council[i] >= 0 ? councils[council[i]] : null
+        };
+        for (let j = 0; j < metricCount; j++) {
+          properties[metrics[j]] = raw[i * metricCount + j];
+          properties[`norm_${metrics[j]}`] = norm[i * metricCount + j];
+        }
+        within.push({ properties });
+      }
+    }
+
+    return within;
+  },
+
+  // Outline the matched datazones on the rendered 'datazones' source with a
+  // filter on their codes, so no polygon geometry has to be copied
+  highlightDatazones(datazones) {
+    if (!this.map.getSource('datazones')) return;
+
+    const codes = datazones
+      .map(datazone => datazone.properties && datazone.properties.DataZone)
+      .filter(code => code != null);
+    const filter = ['in', ['get', 'DataZone'], ['literal', codes]];
+
+    if (this.map.getLayer('datazones-within-highlight')) {
+      this.map.setFilter('datazones-within-highlight', filter);
+    } else {
+      this.map.addLayer({
+        id: 'datazones-within-highlight',
+        type: 'line',
+        source: 'datazones',
+        filter,
+        paint: {
+          'line-color': '#6666CC',
+          'line-width': 2
+        }
+      });
+    }
+  },
+
   calculateCentroid(feature) {
     if (!feature || !feature.geometry || feature.geometry.type !== 'Polygon') return null;
     
@@ -81,9 +81,38 @@ async function fetch_datazones() {
     }
 }
 
+async function fetch_datazone_lookup() {
+    // Precomputed centroids, grid buckets and metric matrices written by
+    // 00-data/processing/datazone_lookup.py
+    const basePath = './00-data/geojson/datazone-lookup';
+
+    const [metaResponse, binResponse] = await Promise.all([
+        fetch(`${basePath}.json`),
+        fetch(`${basePath}.bin`)
+    ]);
+
+    if (!metaResponse.ok || !binResponse.ok) {
+        throw new Error(`Failed to load datazone lookup: ${metaResponse.status} / ${binResponse.status}`);
+    }
+
+    const meta = await metaResponse.json();
+    const buffer = await binResponse.arrayBuffer();
+
+    const arrayTypes = { float32: Float32Array, uint32: Uint32Array, int32: Int32Array };
+    const arrays = {};
+    Object.entries(meta.arrays).forEach(([name, { offset, length, type }]) => {
+        arrays[name] = new arrayTypes[type](buffer, offset, length);
+    });
+
+    console.log(`Datazone lookup loaded: ${meta.count} datazones, ${meta.metrics.length} metrics`);
+
+    return { ...meta, ...arrays };
+}
+
 // Export the functions to be used in other files
 export {
     fetch_empty_landsData,
     fetch_railway_stations,
     fetch_datazones,
+    fetch_datazone_lookup,
 };
\ No newline at end of file